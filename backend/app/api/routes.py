@@ -1,6 +1,10 @@
-from fastapi import APIRouter, Response
+import asyncio
+import re
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 from app.models.spec import DiagramSpec, LayoutSpec, LayoutNode, LayoutEdge, LayoutConstraints
 
@@ -16,6 +20,14 @@ class GenerateRequest(BaseModel):
     text: str
     diagram_type: str = "flowchart"
     session_id: Optional[str] = None
+    # "edit" patches an existing diagram instead of generating a new one. `text`
+    # is then the new or changed source text (may be empty if `instruction` is set).
+    # "large" splits long documents into groups generated concurrently, for
+    # diagrams beyond the single-pass node limit.
+    mode: Literal["generate", "edit", "large"] = "generate"
+    # Diagram to edit; defaults to the latest diagram in the session.
+    base_spec: Optional[DiagramSpec] = None
+    instruction: Optional[str] = None
 
 class IngestRequest(BaseModel):
     text: str
@@ -28,11 +40,30 @@ class LayoutRequest(BaseModel):
 class ExportRequest(BaseModel):
     layout_spec: LayoutSpec
 
+class BatchExportItem(BaseModel):
+    layout_spec: LayoutSpec
+    name: Optional[str] = None
+
+class BatchExportRequest(BaseModel):
+    layouts: List[BatchExportItem]
+
+# 100 layouts of MAX_DIAGRAM_NODES nodes encode to about 12 MB, within the
+# route's body limit (MAX_LAYOUT_REQUEST_BYTES); keep the two in step.
+MAX_BATCH_EXPORT = 100
+
 
 router = APIRouter(prefix="/v1")
 
 from app.services.ingestion import process_ingestion
-from app.core.database import get_session_history as fetch_db_history
+from app.core.database import get_session_history_raw as fetch_db_history_raw
+from app.core.serialization import json_array_response, model_response
+from app.core.admission import AdmissionRejected, client_limiter, session_limiter, generation_gate, ingestion_gate
+
+def _too_many_requests(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": e.retry_after_header})
+
+def _client_key(http_request: Request) -> str:
+    return http_request.client.host if http_request.client else "unknown"
 
 @router.get("/session/{session_id}/history", tags=["Knowledge Base"])
 async def get_history(session_id: str):
@@ -40,21 +71,28 @@ async def get_history(session_id: str):
     Returns the past diagrams for a given session.
     """
     try:
-        history = await fetch_db_history(session_id, limit=10)
-        return history
+        # Specs are stored as JSON text; send them without decoding and re-encoding.
+        history = await fetch_db_history_raw(session_id, limit=10)
+        return json_array_response(history)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/ingest", tags=["Knowledge Base"])
-async def ingest_knowledge(request: IngestRequest):
+async def ingest_knowledge(request: IngestRequest, http_request: Request):
     """
     Ingests text into the knowledge base for RAG.
     """
     try:
-        num_chunks = process_ingestion(request.text, request.source_label)
-        return {"status": "success", "message": f"Ingested {num_chunks} chunks."}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        client_limiter.check(_client_key(http_request), "this client")
+        async with ingestion_gate.slot():
+            try:
+                # Chunk embedding blocks on the embeddings API; run it off the event loop.
+                num_chunks = await asyncio.to_thread(process_ingestion, request.text, request.source_label)
+                return {"status": "success", "message": f"Ingested {num_chunks} chunks."}
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=str(e))
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
 
 @router.post("/analyze", response_model=AnalysisResponse, tags=["Diagram Generation"])
 async def analyze_text(request: AnalysisRequest):
@@ -65,28 +103,65 @@ async def analyze_text(request: AnalysisRequest):
     return AnalysisResponse(steps=["Step 1: Analyze user text", "Step 2: Identify key entities", "Step 3: Determine relationships"])
 
 from app.services.generator import generate_diagram_spec, DiagramGenerationError
+from app.services.editor import edit_diagram_spec, resolve_base_spec
+from app.services.large_generator import DocumentTooLargeError, generate_large_diagram_spec, partition_text
 from app.services.vector_store import retrieve_context
 from fastapi import HTTPException
 
 # ... (other code)
 
 @router.post("/generate", response_model=DiagramSpec, tags=["Diagram Generation"])
-async def generate_diagram(request: GenerateRequest):
+async def generate_diagram(request: GenerateRequest, http_request: Request):
     """
     Generates a diagram specification from a text prompt using an LLM.
     Uses RAG to augment the prompt with relevant context.
+    With `mode="edit"`, only a patch to `base_spec` (or the session's latest
+    diagram) is generated and merged locally. With `mode="large"`, the text is
+    split into groups that are generated concurrently and stitched together;
+    text too long for one diagram is refused with 413.
+    Requests over the client/session rate limits, or arriving while the
+    generation queue is full, are refused with 429 and a Retry-After header.
+    A large request is charged one extra request per group, and each group
+    waits for its own generation slot.
     """
+    if request.mode == "large" and not request.text.strip():
+        raise HTTPException(status_code=400, detail="Large mode needs non-empty `text`.")
+    try:
+        cost = 1
+        if request.mode == "large":
+            cost += len(partition_text(request.text))
+        client_limiter.check(_client_key(http_request), "this client", cost=cost)
+        if request.session_id:
+            session_limiter.check(request.session_id, "this session")
+        if request.mode == "large":
+            return model_response(await _run_generation(request))
+        async with generation_gate.slot():
+            return model_response(await _run_generation(request))
+    except DocumentTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
+
+async def _run_generation(request: GenerateRequest) -> DiagramSpec:
+    if request.mode == "edit":
+        return await _run_edit(request)
     try:
-        # Retrieve relevant context from knowledge base
-        context_results = retrieve_context(request.text, top_k=3)
+        # Retrieve relevant context from knowledge base. Embedding the query and
+        # the vector store lookup (possibly a storage service round trip) block,
+        # so they run in a worker thread.
+        context_results = await asyncio.to_thread(retrieve_context, request.text, top_k=3)
         context_text = "\n\n".join([res['text'] for res in context_results])
         
-        diagram_spec = await generate_diagram_spec(
+        generate = generate_large_diagram_spec if request.mode == "large" else generate_diagram_spec
+        diagram_spec = await generate(
             request.text, 
             context=context_text, 
             session_id=request.session_id
         )
         return diagram_spec
+    except AdmissionRejected:
+        # A large-diagram section could not get a generation slot.
+        raise
     except DiagramGenerationError as e:
         # This is a controlled failure from our generation service
         raise HTTPException(status_code=500, detail=str(e))
@@ -95,7 +170,31 @@ async def generate_diagram(request: GenerateRequest):
         print(f"An unexpected error occurred in generate_diagram: {e}")
         raise HTTPException(status_code=500, detail=f"An unexpected server error occurred.")
 
+async def _run_edit(request: GenerateRequest) -> DiagramSpec:
+    if not request.text.strip() and not (request.instruction or "").strip():
+        raise HTTPException(status_code=400, detail="Edit mode needs `text` or `instruction`.")
+    try:
+        base_spec = await resolve_base_spec(request.base_spec, request.session_id)
+    except Exception as e:
+        print(f"Failed to load the base spec for edit mode: {e}")
+        raise HTTPException(status_code=500, detail="Could not load the session's previous diagram.")
+    if base_spec is None:
+        raise HTTPException(status_code=400, detail="Edit mode needs `base_spec` or a session with a previous diagram.")
+    try:
+        return await edit_diagram_spec(
+            base_spec,
+            text=request.text,
+            instruction=request.instruction,
+            session_id=request.session_id
+        )
+    except DiagramGenerationError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        print(f"An unexpected error occurred in edit mode: {e}")
+        raise HTTPException(status_code=500, detail=f"An unexpected server error occurred.")
+
 from app.services.layout import calculate_layout, LayoutError
+from app.services.svg_export import export_svg_stream, export_zip_stream, layout_hash, svg_cache
 
 # ... (other code)
 
@@ -109,7 +208,7 @@ async def layout_diagram(request: LayoutRequest):
     try:
         # Pass both the spec and any potential constraints to the layout service.
         layout_spec = calculate_layout(request.diagram_spec, request.constraints)
-        return layout_spec
+        return model_response(layout_spec)
     except LayoutError as e:
         raise HTTPException(status_code=500, detail=f"Layout Engine Failed: {e}")
     except Exception as e:
@@ -117,30 +216,51 @@ async def layout_diagram(request: LayoutRequest):
         print(f"An unexpected error occurred in layout_diagram: {e}")
         raise HTTPException(status_code=500, detail=f"An unexpected server error occurred during layout.")
 
-@router.post("/export/svg", response_model=str, tags=["Layout & Export"], responses={200: {"content": {"image/svg+xml": {}}}})
-async def export_svg(request: ExportRequest):
+@router.post("/export/svg", response_model=str, tags=["Layout & Export"], responses={200: {"content": {"image/svg+xml": {}}}, 304: {}})
+async def export_svg(request: ExportRequest, http_request: Request):
     """
-    (Placeholder) Exports a layout specification to an SVG image string.
+    Exports a layout specification to an SVG image. Responses carry an ETag
+    derived from the layout; a matching If-None-Match gets 304 Not Modified.
     """
-    svg_elements = []
-    max_x, max_y = 0, 0
-    for node in request.layout_spec.nodes:
-        svg_elements.append(f'<rect x="{node.x}" y="{node.y}" rx="5" ry="5" width="{node.width}" height="{node.height}" fill="#fff" stroke="#333" stroke-width="2"/>')
-        svg_elements.append(f'<text x="{node.x + node.width / 2}" y="{node.y + node.height / 2}" dominant-baseline="middle" text-anchor="middle" font-family="sans-serif" font-size="12">{node.text}</text>')
-        max_x = max(max_x, node.x + node.width)
-        max_y = max(max_y, node.y + node.height)
-
-    for edge in request.layout_spec.edges:
-        if edge.points:
-            path_data = "M " + " L ".join([f"{p[0]},{p[1]}" for p in edge.points])
-            svg_elements.append(f'<path d="{path_data}" stroke="#333" stroke-width="2" fill="none" marker-end="url(#arrowhead)" />')
-            
-    svg_header = f'''<svg width="{max_x + 50}" height="{max_y + 50}" xmlns="http://www.w3.org/2000/svg">
-    <defs>
-        <marker id="arrowhead" markerWidth="10" markerHeight="7" refX="0" refY="3.5" orient="auto">
-            <polygon points="0 0, 10 3.5, 0 7" />
-        </marker>
-    </defs>
-    '''
-    svg_content = f'{svg_header}{"".join(svg_elements)}</svg>'
-    return Response(content=svg_content, media_type="image/svg+xml")
+    key = layout_hash(request.layout_spec)
+    # Weak, because the body may be brotli-, gzip- or not compressed per client.
+    etag = f'W/"{key}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=0, must-revalidate", "Vary": "Accept-Encoding"}
+    if _etag_matches(http_request.headers.get("if-none-match"), key):
+        return Response(status_code=304, headers=headers)
+
+    cached = svg_cache.get(key)
+    if cached is not None:
+        return Response(content=cached, media_type="image/svg+xml", headers=headers)
+    return StreamingResponse(export_svg_stream(request.layout_spec, key), media_type="image/svg+xml", headers=headers)
+
+@router.post("/export/svg/batch", tags=["Layout & Export"], responses={200: {"content": {"application/zip": {}}}})
+async def export_svg_batch(request: BatchExportRequest):
+    """
+    Exports several layouts as SVG files in a zip archive, streamed as it is built.
+    """
+    if not request.layouts:
+        raise HTTPException(status_code=400, detail="No layouts to export.")
+    if len(request.layouts) > MAX_BATCH_EXPORT:
+        raise HTTPException(status_code=400, detail=f"Too many layouts. Maximum is {MAX_BATCH_EXPORT}.")
+
+    entries = [
+        (f"{i + 1:03d}-{_safe_file_name(item.name or 'diagram')}.svg", item.layout_spec)
+        for i, item in enumerate(request.layouts)
+    ]
+    return StreamingResponse(
+        export_zip_stream(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="diagrams.zip"'},
+    )
+
+def _etag_matches(if_none_match: Optional[str], key: str) -> bool:
+    """Weak comparison of If-None-Match against the ETag for `key`."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == f'"{key}"' for tag in tags)
+
+def _safe_file_name(name: str) -> str:
+    cleaned = re.sub(r"[^A-Za-z0-9._-]+", "-", name).strip("-.")
+    return cleaned[:60] or "diagram"
@@ -0,0 +1,247 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional
+
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+
+# --- Admission control ---
+#
+# Three layers keep bursts of expensive requests from exhausting LLM quota and
+# memory: a cap on request body size, token buckets per client and per session,
+# and a bounded queue in front of the generation pipeline. Limits are per
+# process; with several workers each enforces its own share.
+
+class AdmissionRejected(Exception):
+    """Raised when a request is refused; `retry_after` is in seconds."""
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+# --- Request size ---
+
+class LimitRequestSizeMiddleware:
+    """
+    Rejects request bodies larger than `max_size` bytes with 413, or larger
+    than the limit in `path_limits` for that path. Checks the Content-Length
+    header up front; bodies without one (chunked) are buffered up to the
+    limit before the app sees them.
+    """
+    def __init__(self, app, max_size: int, path_limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.max_size = max_size
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        max_size = self.path_limits.get(scope["path"], self.max_size)
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                if value.isdigit() and int(value) > max_size:
+                    await self._reject(scope, receive, send, max_size)
+                    return
+                # The server never delivers more than Content-Length bytes.
+                await self.app(scope, receive, send)
+                return
+
+        # Errors raised while the app reads the body are turned into 400 by
+        # FastAPI, so the whole body is read here and the 413 sent directly.
+        chunks = []
+        received = 0
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return  # Client disconnected.
+            chunks.append(message.get("body", b""))
+            received += len(chunks[-1])
+            if received > max_size:
+                await self._reject(scope, receive, send, max_size)
+                return
+            if not message.get("more_body", False):
+                break
+
+        body = {"type": "http.request", "body": b"".join(chunks), "more_body": False}
+        await self.app(scope, _replay([body], receive), send)
+
+    async def _reject(self, scope, receive, send, max_size: int):
+        response = JSONResponse(
+            {"detail": f"Request body is too large. Maximum is {max_size} bytes."},
+            status_code=413,
+        )
+        await response(scope, receive, send)
+
+def _replay(messages, receive):
+    """A receive callable that returns `messages` first, then defers to `receive`."""
+    pending = list(messages)
+
+    async def replay_receive():
+        if pending:
+            return pending.pop(0)
+        return await receive()
+    return replay_receive
+
+# --- Rate limiting ---
+
+class TokenBucket:
+    """Allows `rate` requests per second on average, with bursts up to `capacity`."""
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def try_acquire(self, cost: float = 1) -> float:
+        """
+        Takes `cost` tokens. Returns 0 on success, otherwise seconds until they
+        are available. A cost above `capacity` is admitted once the bucket is
+        full and leaves it in debt, which later requests wait out.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        needed = min(cost, self.capacity)
+        if self.tokens >= needed:
+            self.tokens -= cost
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+class RateLimiter:
+    """
+    A token bucket per key (client address, session id, ...). Only the most
+    recently used `max_keys` buckets are kept; an evicted key starts again
+    with a full bucket.
+    """
+    def __init__(self, per_minute: float, burst: int, max_keys: int = 10_000):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.rejected = 0
+
+    def check(self, key: str, label: str, cost: float = 1):
+        """Charges `cost` tokens to `key`; raises AdmissionRejected if it has used up its allowance."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+
+        wait = bucket.try_acquire(cost)
+        if wait > 0:
+            self.rejected += 1
+            raise AdmissionRejected(f"Rate limit exceeded for {label}.", retry_after=wait)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"tracked_keys": len(self._buckets), "rejected": self.rejected}
+
+# --- Bounded work queue ---
+
+class AdmissionGate:
+    """
+    Runs at most `max_concurrency` jobs at once with at most `max_queue` more
+    waiting. Requests that would overflow the queue, or that wait longer than
+    `queue_timeout` seconds, are refused so latency stays bounded.
+    """
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._wait_times: Deque[float] = deque(maxlen=1000)
+        # Exponential moving average of how long a job holds its slot, used to
+        # estimate Retry-After.
+        self._avg_service_time = 1.0
+
+    def _retry_after(self) -> float:
+        return (self.waiting + 1) * self._avg_service_time / self.max_concurrency
+
+    @asynccontextmanager
+    async def slot(self):
+        """Takes a free slot, or waits in the queue for one, or raises AdmissionRejected."""
+        queued_at = time.perf_counter()
+        if not self._semaphore.locked():
+            # A slot is free and nobody is waiting: this does not block.
+            await self._semaphore.acquire()
+        else:
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise AdmissionRejected(f"The {self.name} queue is full.", retry_after=self._retry_after())
+
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise AdmissionRejected(f"Timed out waiting in the {self.name} queue.", retry_after=self._retry_after())
+            finally:
+                self.waiting -= 1
+
+        started = time.perf_counter()
+        self._wait_times.append(started - queued_at)
+        self.admitted += 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            self._avg_service_time = 0.8 * self._avg_service_time + 0.2 * (time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._wait_times)
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "wait_ms_avg": round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+            "wait_ms_p95": round(waits[max(0, math.ceil(len(waits) * 0.95) - 1)] * 1000, 2) if waits else 0.0,
+            "wait_ms_max": round(waits[-1] * 1000, 2) if waits else 0.0,
+            "avg_service_s": round(self._avg_service_time, 3),
+        }
+
+# --- Shared instances ---
+
+client_limiter = RateLimiter(settings.RATE_LIMIT_CLIENT_PER_MINUTE, settings.RATE_LIMIT_CLIENT_BURST)
+session_limiter = RateLimiter(settings.RATE_LIMIT_SESSION_PER_MINUTE, settings.RATE_LIMIT_SESSION_BURST)
+generation_gate = AdmissionGate(
+    "generation",
+    max_concurrency=settings.GENERATE_MAX_CONCURRENCY,
+    max_queue=settings.GENERATE_MAX_QUEUE,
+    queue_timeout=settings.GENERATE_QUEUE_TIMEOUT,
+)
+ingestion_gate = AdmissionGate(
+    "ingestion",
+    max_concurrency=settings.INGEST_MAX_CONCURRENCY,
+    max_queue=settings.INGEST_MAX_QUEUE,
+    queue_timeout=settings.INGEST_QUEUE_TIMEOUT,
+)
+
+def admission_stats() -> Dict[str, Any]:
+    return {
+        "generation": generation_gate.stats(),
+        "ingestion": ingestion_gate.stats(),
+        "client_rate_limit": client_limiter.stats(),
+        "session_rate_limit": session_limiter.stats(),
+    }
@@ -0,0 +1,171 @@
+import gzip
+import zlib
+from typing import List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available.
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "image/svg+xml", "text/")
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Picks the best supported encoding from an Accept-Encoding header, honouring
+    q-values. Prefers brotli over gzip when the client accepts both equally.
+    """
+    accepted = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for encoding in candidates:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        # Quality 4 is close to gzip's ratio at a fraction of brotli's
+        # default (11) CPU cost, which suits per-request compression.
+        return brotli.compress(body, quality=4)
+    return gzip.compress(body, compresslevel=5)
+
+class StreamCompressor:
+    """Incremental brotli or gzip compression, for bodies sent in several chunks."""
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=4)
+            self._compress, self._finish = self._compressor.process, self._compressor.finish
+        else:
+            # wbits=31 writes a gzip header and trailer around the deflate stream.
+            self._compressor = zlib.compressobj(5, zlib.DEFLATED, 31)
+            self._compress, self._finish = self._compressor.compress, self._compressor.flush
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compress(data)
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+def _vary_headers(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    """Headers with Accept-Encoding added to Vary (once) and Content-Length dropped."""
+    vary = [v.decode("latin-1") for k, v in headers if k.lower() == b"vary"]
+    values = [v.strip() for value in vary for v in value.split(",") if v.strip()]
+    if not any(v.lower() == "accept-encoding" for v in values):
+        values.append("Accept-Encoding")
+    kept = [(k, v) for k, v in headers if k.lower() not in (b"content-length", b"vary")]
+    return kept + [(b"vary", ", ".join(values).encode("latin-1"))]
+
+class CompressionMiddleware:
+    """
+    Compresses JSON and SVG responses of at least `minimum_size` bytes with
+    brotli or gzip, as negotiated via Accept-Encoding. Streaming responses
+    (bodies sent in several chunks) of those types are compressed chunk by
+    chunk, whatever their size.
+    """
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+        stream: Optional[StreamCompressor] = None
+
+        async def compressing_send(message):
+            nonlocal start_message, passthrough, stream
+            if passthrough:
+                await send(message)
+                return
+
+            if stream is not None:
+                if message["type"] != "http.response.body":
+                    await send(message)
+                    return
+                more_body = message.get("more_body", False)
+                data = stream.compress(message.get("body", b""))
+                if not more_body:
+                    data += stream.finish()
+                if data or not more_body:
+                    await send({"type": "http.response.body", "body": data, "more_body": more_body})
+                return
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers: List[Tuple[bytes, bytes]] = list(start_message.get("headers", []))
+            if message.get("more_body", False):
+                if not self._should_compress(headers, None):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                stream = StreamCompressor(encoding)
+                headers = _vary_headers(headers) + [(b"content-encoding", encoding.encode("latin-1"))]
+                await send({**start_message, "headers": headers})
+                await compressing_send(message)
+                return
+
+            if not self._should_compress(headers, body):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            headers = _vary_headers(headers) + [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+            ]
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, compressing_send)
+
+    def _should_compress(self, headers: List[Tuple[bytes, bytes]], body: Optional[bytes]) -> bool:
+        """`body` is None for a streamed response, whose size is not known up front."""
+        if body is not None and len(body) < self.minimum_size:
+            return False
+        content_type = b""
+        for name, value in headers:
+            lowered = name.lower()
+            if lowered == b"content-encoding":
+                return False
+            if lowered == b"content-type":
+                content_type = value
+        content_type_str = content_type.decode("latin-1").lower()
+        return any(content_type_str.startswith(t) for t in COMPRESSIBLE_TYPES)
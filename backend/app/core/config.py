@@ -1,10 +1,39 @@
 from pydantic import BaseSettings
-from typing import List
+from typing import List, Optional
 
 class Settings(BaseSettings):
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://127.0.0.1:3000"]
+    # Initialize the vector store, LLM client and agent graph in the background
+    # after startup instead of on the first request.
+    WARMUP_ON_STARTUP: bool = True
+    # Address of the storage service that owns ChromaDB and SQLite when running
+    # several web workers, e.g. "unix:/tmp/flowra-storage.sock" or "127.0.0.1:8765".
+    # Leave unset to run single-process with in-process storage.
+    STORAGE_SERVICE_ADDRESS: Optional[str] = None
+    STORAGE_POOL_SIZE: int = 8
+
+    # Request body limit for every route but layout and export.
+    MAX_REQUEST_BYTES: int = 1_048_576
+    # Body limit for /v1/layout and the export routes, which carry whole layouts.
+    MAX_LAYOUT_REQUEST_BYTES: int = 16 * 1_048_576
+
+    # Admission control for /v1/generate and /v1/ingest (per worker process).
+    RATE_LIMIT_CLIENT_PER_MINUTE: float = 30
+    RATE_LIMIT_CLIENT_BURST: int = 10
+    RATE_LIMIT_SESSION_PER_MINUTE: float = 10
+    RATE_LIMIT_SESSION_BURST: int = 3
+    GENERATE_MAX_CONCURRENCY: int = 4
+    GENERATE_MAX_QUEUE: int = 16
+    GENERATE_QUEUE_TIMEOUT: float = 30.0
+    INGEST_MAX_CONCURRENCY: int = 2
+    INGEST_MAX_QUEUE: int = 8
+    INGEST_QUEUE_TIMEOUT: float = 30.0
+
+    # Sections generated at once per large-diagram request.
+    LARGE_DIAGRAM_CONCURRENCY: int = 4
 
     class Config:
         case_sensitive = True
+        env_file = ".env"
 
 settings = Settings()
@@ -1,9 +1,13 @@
+import asyncio
+import json
 import os
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy import Column, String, Integer, Text, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, Text, DateTime, ForeignKey, event, select, text
 import datetime
 
+from app.core.storage_client import get_storage_client
+
 # Create data directory if it doesn't exist
 DATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
 os.makedirs(DATA_DIR, exist_ok=True)
@@ -14,6 +18,15 @@ engine = create_async_engine(DATABASE_URL, echo=False)
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base()
 
+@event.listens_for(engine.sync_engine, "connect")
+def _configure_sqlite(dbapi_connection, connection_record):
+    # WAL lets readers proceed while a write is in progress, and the busy
+    # timeout makes concurrent writers wait instead of failing immediately.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
 class DiagramSession(Base):
     __tablename__ = "diagram_sessions"
     id = Column(Integer, primary_key=True, index=True)
@@ -21,24 +34,53 @@ class DiagramSession(Base):
     diagram_spec = Column(Text) # JSON string
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
+# When a storage service is configured (see app.core.storage_client), it owns
+# the SQLite file and the public functions below forward to it. Otherwise they
+# run against the local engine.
+
 async def init_db():
+    if get_storage_client() is not None:
+        return
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
+async def check_db():
+    """Readiness probe: runs a trivial query against the session database."""
+    client = get_storage_client()
+    if client is not None:
+        await asyncio.to_thread(client.call, "check_db")
+        return
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
 async def save_diagram_to_session(session_id: str, spec_dict: dict):
+    client = get_storage_client()
+    if client is not None:
+        # Serialize here so enums and other JSON-compatible types are encoded
+        # exactly as the local path would store them.
+        spec_json = json.dumps(spec_dict)
+        await asyncio.to_thread(client.call, "save_diagram", session_id=session_id, spec_json=spec_json)
+        return
+    await save_diagram_json(session_id, json.dumps(spec_dict))
+
+async def save_diagram_json(session_id: str, spec_json: str):
     async with AsyncSessionLocal() as session:
         new_entry = DiagramSession(
             session_id=session_id,
-            diagram_spec=json.dumps(spec_dict)
+            diagram_spec=spec_json
         )
         session.add(new_entry)
         await session.commit()
 
-import json
-from sqlalchemy import select
-
-async def get_session_history(session_id: str, limit: int = 3):
+async def get_session_history_raw(session_id: str, limit: int = 3):
+    """Returns the session's most recent diagram specs as stored JSON strings."""
+    client = get_storage_client()
+    if client is not None:
+        return await asyncio.to_thread(client.call, "get_history_raw", session_id=session_id, limit=limit)
     async with AsyncSessionLocal() as session:
-        query = select(DiagramSession).where(DiagramSession.session_id == session_id).order_by(DiagramSession.created_at.desc()).limit(limit)
+        query = select(DiagramSession.diagram_spec).where(DiagramSession.session_id == session_id).order_by(DiagramSession.created_at.desc()).limit(limit)
         result = await session.execute(query)
-        return [json.loads(row.diagram_spec) for row in result.scalars()]
+        return list(result.scalars())
+
+async def get_session_history(session_id: str, limit: int = 3):
+    return [json.loads(spec_json) for spec_json in await get_session_history_raw(session_id, limit)]
@@ -0,0 +1,25 @@
+from typing import Iterable
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from starlette.responses import Response
+
+# --- Fast responses ---
+#
+# FastAPI's default path for a `response_model` re-validates the returned
+# model, runs it through `jsonable_encoder` and then `json.dumps`. For large
+# layouts and histories that is most of the request's CPU time. These helpers
+# return a ready Response instead, which FastAPI sends as-is; the route keeps
+# its `response_model` for the OpenAPI docs.
+
+def model_response(model: BaseModel, status_code: int = 200) -> ORJSONResponse:
+    """Serializes a Pydantic model (by alias, as the API's JSON uses) with orjson."""
+    return ORJSONResponse(model.dict(by_alias=True), status_code=status_code)
+
+def json_array_response(items: Iterable[str]) -> Response:
+    """
+    Returns already-encoded JSON documents as one JSON array without parsing
+    them, e.g. diagram specs stored as JSON text in the session database.
+    """
+    body = "[" + ",".join(items) + "]"
+    return Response(content=body.encode("utf-8"), media_type="application/json")
@@ -0,0 +1,146 @@
+import json
+import socket
+import threading
+from typing import Any, List, Optional, Tuple, Union
+
+from app.core.config import settings
+
+# --- Multi-process storage ---
+#
+# ChromaDB's PersistentClient and the SQLite session database are owned by a
+# single process. With one web worker that is the API process itself. When
+# STORAGE_SERVICE_ADDRESS is set, web workers instead forward storage calls to
+# the storage service (`python -m app.services.storage_server`) over a local
+# socket, so several uvicorn/gunicorn workers never write to the files directly.
+#
+# Wire format: one JSON object per line in each direction.
+#   request:  {"op": "...", "args": {...}}
+#   response: {"ok": true, "result": ...} or {"ok": false, "error": "..."}
+
+Address = Union[str, Tuple[str, int]]
+
+class StorageServiceError(Exception):
+    """Raised when the storage service is unreachable or reports an error."""
+    pass
+
+def parse_address(address: str) -> Address:
+    """
+    Parses 'unix:/path/to.sock' into a socket path and 'host:port' into a
+    (host, port) tuple.
+    """
+    if address.startswith("unix:"):
+        return address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Invalid storage service address '{address}'. Use 'unix:/path' or 'host:port'.")
+    return host, int(port)
+
+class _Connection:
+    def __init__(self, address: Address, timeout: float):
+        if isinstance(address, str):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.settimeout(timeout)
+        self.sock.connect(address)
+        self.reader = self.sock.makefile("rb")
+
+    def request(self, payload: bytes) -> bytes:
+        self.sock.sendall(payload)
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("Storage service closed the connection.")
+        return line
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+class StorageClient:
+    """
+    A thread-safe client for the storage service with a pool of persistent
+    connections. At most `pool_size` requests are in flight at once; extra
+    callers wait for a connection to be returned.
+    """
+    def __init__(self, address: str, pool_size: int = 8, timeout: float = 30.0):
+        self.address = parse_address(address)
+        self.timeout = timeout
+        self._idle: List[_Connection] = []
+        self._idle_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    def _acquire(self) -> _Connection:
+        with self._idle_lock:
+            if self._idle:
+                return self._idle.pop()
+        return _Connection(self.address, self.timeout)
+
+    def _release(self, conn: _Connection):
+        with self._idle_lock:
+            self._idle.append(conn)
+
+    def call(self, op: str, **args: Any) -> Any:
+        """Runs `op` on the storage service and returns its result."""
+        payload = json.dumps({"op": op, "args": args}).encode("utf-8") + b"\n"
+        if not self._slots.acquire(timeout=self.timeout):
+            raise StorageServiceError(f"Timed out waiting for a storage connection for '{op}'.")
+        try:
+            # A pooled connection may have been closed by a service restart;
+            # retry once on a fresh connection before giving up.
+            for attempt in range(2):
+                try:
+                    conn = self._acquire()
+                except OSError as e:
+                    raise StorageServiceError(f"Could not connect to storage service at {self.address}: {e}")
+                try:
+                    line = conn.request(payload)
+                except (OSError, ConnectionError) as e:
+                    conn.close()
+                    if attempt == 1:
+                        raise StorageServiceError(f"Storage service request '{op}' failed: {e}")
+                    continue
+                self._release(conn)
+                break
+        finally:
+            self._slots.release()
+
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise StorageServiceError(response.get("error", f"Storage service request '{op}' failed."))
+        return response.get("result")
+
+    def close(self):
+        with self._idle_lock:
+            for conn in self._idle:
+                conn.close()
+            self._idle.clear()
+
+_storage_client: Optional[StorageClient] = None
+_storage_client_lock = threading.Lock()
+_local_only = False
+
+def use_local_storage():
+    """Called by the storage service itself so it never forwards to itself."""
+    global _local_only
+    _local_only = True
+
+def get_storage_client() -> Optional[StorageClient]:
+    """
+    Returns the shared storage client when a storage service is configured,
+    or None when this process owns the vector store and database itself.
+    """
+    global _storage_client
+    if _local_only or not settings.STORAGE_SERVICE_ADDRESS:
+        return None
+    if _storage_client is None:
+        with _storage_client_lock:
+            if _storage_client is None:
+                _storage_client = StorageClient(
+                    settings.STORAGE_SERVICE_ADDRESS,
+                    pool_size=settings.STORAGE_POOL_SIZE,
+                )
+    return _storage_client
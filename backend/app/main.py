@@ -1,5 +1,8 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 try:
     from app.core.config import settings
@@ -7,50 +10,45 @@ except (ImportError, ModuleNotFoundError):
     # Fallback for local development if config file is missing or path issues
     class MockSettings:
         CORS_ORIGINS = ["http://localhost:3000", "http://127.0.0.1:3000"]
+        WARMUP_ON_STARTUP = True
+        MAX_REQUEST_BYTES = 1_048_576
+        MAX_LAYOUT_REQUEST_BYTES = 16 * 1_048_576
     settings = MockSettings()
 
 from app.api.routes import router as api_router
 from app.core.database import init_db
+from app.core.admission import LimitRequestSizeMiddleware, admission_stats
+from app.core.compression import CompressionMiddleware
+from app.services.readiness import readiness_report, warm_up
 
 app = FastAPI(
     title="Summary Visualizer API",
     description="API for converting text summaries into diagrams.",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 @app.on_event("startup")
 async def on_startup():
     await init_db()
+    if settings.WARMUP_ON_STARTUP:
+        # Keep a reference so the task is not garbage-collected mid-run.
+        app.state.warmup_task = asyncio.create_task(warm_up())
 
 # --- Middleware ---
 
-# Placeholder for request size limit middleware.
-# Note: For a production app, consider a more robust solution like a reverse proxy (e.g., Nginx) to handle this.
-# from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseCall
-# from starlette.requests import Request
-# from starlette.responses import Response
-# class LimitRequestSizeMiddleware(BaseHTTPMiddleware):
-#     def __init__(self, app: object, max_size: int) -> None:
-#         super().__init__(app)
-#         self.max_size = max_size
-#
-#     async def dispatch(self, request: Request, call_next: RequestResponseCall) -> Response:
-#         content_length = request.headers.get('content-length')
-#         if content_length and int(content_length) > self.max_size:
-#             return Response("Request body is too large", status_code=413)
-#         return await call_next(request)
-#
-# app.add_middleware(LimitRequestSizeMiddleware, max_size=1_048_576) # 1MB limit
-
-
-# Placeholder for rate limit middleware
-# from slowapi import Limiter, _rate_limit_exceeded_handler
-# from slowapi.util import get_remote_address
-# from slowapi.errors import RateLimitExceeded
-#
-# limiter = Limiter(key_func=get_remote_address, default_limits=["100 per minute"])
-# app.state.limiter = limiter
-# app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+# Request size limit: rejects oversized bodies with 413 before they are parsed.
+# Layout and export requests carry whole layouts, so they get a higher limit.
+# Rate limits and the generation queue are applied per route (see app.core.admission).
+LAYOUT_ROUTES = ("/v1/layout", "/v1/export/svg", "/v1/export/svg/batch")
+app.add_middleware(
+    LimitRequestSizeMiddleware,
+    max_size=settings.MAX_REQUEST_BYTES,
+    path_limits={path: settings.MAX_LAYOUT_REQUEST_BYTES for path in LAYOUT_ROUTES},
+)
+
+# Response compression: brotli or gzip, as the client accepts, for large JSON and SVG bodies.
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
 
 
 # CORS Middleware: Allows the frontend to communicate with this backend.
@@ -72,9 +70,23 @@ app.include_router(api_router)
 
 @app.get("/health", tags=["Monitoring"])
 async def health_check():
-    """Simple health check endpoint to confirm the API is running."""
+    """Liveness check: confirms the API process is up and serving requests."""
     return {"status": "ok"}
 
+@app.get("/ready", tags=["Monitoring"])
+async def readiness_check():
+    """
+    Readiness check: reports whether the vector store, database, LLM client,
+    agent graph and layout engine are usable. Returns 503 until they all are.
+    """
+    report = await readiness_report()
+    return ORJSONResponse(content=report, status_code=200 if report["ready"] else 503)
+
+@app.get("/stats/admission", tags=["Monitoring"])
+async def admission_statistics():
+    """Queue depth, in-flight work, wait times and rejections for this worker."""
+    return admission_stats()
+
 @app.get("/", include_in_schema=False)
 async def root():
     return {"message": "API is running. See /docs for details."}
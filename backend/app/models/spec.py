@@ -2,7 +2,11 @@ from enum import Enum
 from typing import List, Optional, Tuple, Set, Dict
 from pydantic import BaseModel, Field, validator
 
+# Largest spec a single generation pass may produce (also `maxItems` in the JSON schema).
 MAX_NODES = 40
+# Largest diagram the API accepts overall, e.g. from the group-partitioned
+# large-diagram pipeline, which stitches several passes together.
+MAX_DIAGRAM_NODES = 500
 
 class NodeKind(str, Enum):
     START = "start"
@@ -22,6 +26,10 @@ class Edge(BaseModel):
     to_node: str = Field(alias="to")
     text: Optional[str] = None
 
+    class Config:
+        # Older session history rows were stored by field name.
+        allow_population_by_field_name = True
+
 class Group(BaseModel):
     id: str
     text: str
@@ -35,8 +43,8 @@ class DiagramSpec(BaseModel):
 
     @validator('nodes')
     def validate_max_nodes(cls, v):
-        if len(v) > MAX_NODES:
-            raise ValueError(f"Too many nodes. Maximum is {MAX_NODES}.")
+        if len(v) > MAX_DIAGRAM_NODES:
+            raise ValueError(f"Too many nodes. Maximum is {MAX_DIAGRAM_NODES}.")
         return v
 
     @validator('nodes')
@@ -58,9 +66,40 @@ class LayoutNode(Node):
 class LayoutEdge(Edge):
     points: List[Tuple[float, float]]
 
+class LayoutGroup(Group):
+    # Bounding box of the group, when the layout engine placed it as a compound node.
+    x: Optional[float] = None
+    y: Optional[float] = None
+    width: Optional[float] = None
+    height: Optional[float] = None
+
 class LayoutConstraints(BaseModel):
     locked_nodes: Optional[Dict[str, Dict[str, float]]] = Field(None, alias="lockedNodes")
 
 class LayoutSpec(DiagramSpec):
     nodes: List[LayoutNode]
-    edges: List[LayoutEdge]
\ No newline at end of file
+    edges: List[LayoutEdge]
+    groups: Optional[List[LayoutGroup]] = None
+
+# --- Incremental edits ---
+
+class NodeUpdate(BaseModel):
+    id: str
+    text: Optional[str] = Field(None, min_length=1)
+    kind: Optional[NodeKind] = None
+
+class EdgeRef(BaseModel):
+    from_node: str = Field(alias="from")
+    to_node: str = Field(alias="to")
+
+class EdgeUpdate(EdgeRef):
+    text: Optional[str] = None
+
+class SpecPatch(BaseModel):
+    """A change to an existing DiagramSpec. Removals are applied before additions."""
+    remove_nodes: List[str] = []
+    add_nodes: List[Node] = []
+    update_nodes: List[NodeUpdate] = []
+    remove_edges: List[EdgeRef] = []
+    add_edges: List[Edge] = []
+    update_edges: List[EdgeUpdate] = []
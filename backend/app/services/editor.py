@@ -0,0 +1,215 @@
+import json
+from typing import Any, Dict, List, Optional
+
+from pydantic import ValidationError
+
+from app.core.database import get_session_history, save_diagram_to_session
+from app.models.spec import DiagramSpec, SpecPatch
+from app.services.generator import DiagramGenerationError, MAX_SCHEMA_RETRIES
+from app.services.llm_client import get_gemini_client
+from app.services.validation import ValidationIssue, format_validation_issues, validate_diagram_spec
+
+# --- Incremental editing ---
+#
+# Instead of regenerating the whole diagram, the model is shown the current
+# spec and asked only for a patch. The patch is applied and validated locally,
+# so output tokens and latency grow with the size of the edit rather than the
+# size of the diagram.
+
+class PatchError(Exception):
+    """Raised when a patch cannot be applied to the base spec."""
+    def __init__(self, issues: List[ValidationIssue]):
+        super().__init__(format_validation_issues(issues))
+        self.issues = issues
+
+def _compact_spec(spec: DiagramSpec) -> str:
+    """A compact, line-per-element rendering of a spec for the edit prompt."""
+    lines = ["Nodes (id | kind | text):"]
+    lines += [f"{n.id} | {n.kind.value} | {n.text}" for n in spec.nodes]
+    lines.append("Edges (from -> to | text):")
+    lines += [f"{e.from_node} -> {e.to_node}" + (f" | {e.text}" if e.text else "") for e in spec.edges]
+    if spec.groups:
+        lines.append("Groups (id | text | node ids):")
+        lines += [f"{g.id} | {g.text} | {', '.join(g.node_ids)}" for g in spec.groups]
+    return "\n".join(lines)
+
+def apply_patch(spec: DiagramSpec, patch: SpecPatch) -> Dict[str, Any]:
+    """
+    Applies `patch` to `spec` and returns the merged spec as raw data (by alias),
+    ready for validation. Removing a node also removes its edges and its group
+    memberships; listing such an edge in `remove_edges` as well is allowed.
+    Edges in `add_edges` that already exist with the same label are skipped.
+    Raises PatchError if the patch refers to elements that do not exist, or
+    adds an existing edge with a different label.
+    """
+    issues: List[ValidationIssue] = []
+    nodes = {n.id: {"id": n.id, "text": n.text, "kind": n.kind.value} for n in spec.nodes}
+    edges = [{"from": e.from_node, "to": e.to_node, "text": e.text} for e in spec.edges]
+
+    for i, node_id in enumerate(patch.remove_nodes):
+        if nodes.pop(node_id, None) is None:
+            issues.append(ValidationIssue(path=["remove_nodes", i], message=f"Node '{node_id}' does not exist.", code="unknown_node"))
+    removed = set(patch.remove_nodes)
+    edges = [e for e in edges if e["from"] not in removed and e["to"] not in removed]
+
+    for i, ref in enumerate(patch.remove_edges):
+        remaining = [e for e in edges if not (e["from"] == ref.from_node and e["to"] == ref.to_node)]
+        already_removed = ref.from_node in removed or ref.to_node in removed
+        if len(remaining) == len(edges) and not already_removed:
+            issues.append(ValidationIssue(path=["remove_edges", i], message=f"Edge '{ref.from_node}' -> '{ref.to_node}' does not exist.", code="unknown_edge"))
+        edges = remaining
+
+    for i, node in enumerate(patch.add_nodes):
+        if node.id in nodes:
+            issues.append(ValidationIssue(path=["add_nodes", i, "id"], message=f"Node '{node.id}' already exists; use update_nodes.", code="duplicate_id"))
+            continue
+        nodes[node.id] = {"id": node.id, "text": node.text, "kind": node.kind.value}
+
+    for i, update in enumerate(patch.update_nodes):
+        target = nodes.get(update.id)
+        if target is None:
+            issues.append(ValidationIssue(path=["update_nodes", i, "id"], message=f"Node '{update.id}' does not exist.", code="unknown_node"))
+            continue
+        if update.text is not None:
+            target["text"] = update.text
+        if update.kind is not None:
+            target["kind"] = update.kind.value
+
+    for i, edge in enumerate(patch.add_edges):
+        existing = next((e for e in edges if e["from"] == edge.from_node and e["to"] == edge.to_node), None)
+        if existing is None:
+            edges.append({"from": edge.from_node, "to": edge.to_node, "text": edge.text})
+        elif existing["text"] != edge.text:
+            issues.append(ValidationIssue(path=["add_edges", i], message=f"Edge '{edge.from_node}' -> '{edge.to_node}' already exists; use update_edges to change its text.", code="duplicate_edge"))
+
+    for i, update in enumerate(patch.update_edges):
+        matched = [e for e in edges if e["from"] == update.from_node and e["to"] == update.to_node]
+        if not matched:
+            issues.append(ValidationIssue(path=["update_edges", i], message=f"Edge '{update.from_node}' -> '{update.to_node}' does not exist.", code="unknown_edge"))
+        for e in matched:
+            e["text"] = update.text
+
+    if issues:
+        raise PatchError(issues)
+
+    merged: Dict[str, Any] = {
+        "nodes": list(nodes.values()),
+        # The schema types edge text as a string, so omit it rather than send null.
+        "edges": [{k: v for k, v in e.items() if v is not None} for e in edges],
+    }
+    if spec.groups is not None:
+        merged["groups"] = [
+            {"id": g.id, "text": g.text, "node_ids": [n for n in g.node_ids if n in nodes]}
+            for g in spec.groups
+        ]
+    if spec.style is not None:
+        merged["style"] = spec.style
+    return merged
+
+def _locate_issue(issue: ValidationIssue, merged: Dict[str, Any], patch: SpecPatch) -> ValidationIssue:
+    """
+    Re-expresses an issue found in the merged spec in terms the model saw: the
+    patch entry that introduced the element, or else the element's id.
+    Indices into the merged spec mean nothing to the model.
+    """
+    if len(issue.path) < 2 or issue.path[0] not in ("nodes", "edges", "groups") or not isinstance(issue.path[1], int):
+        return issue
+    section, element, rest = issue.path[0], merged[issue.path[0]][issue.path[1]], issue.path[2:]
+
+    if section == "nodes":
+        for list_name in ("add_nodes", "update_nodes"):
+            for j, node in enumerate(getattr(patch, list_name)):
+                if node.id == element["id"]:
+                    return ValidationIssue(path=[list_name, j, *rest], message=issue.message, code=issue.code)
+        label = f"node '{element['id']}'"
+    elif section == "edges":
+        for list_name in ("add_edges", "update_edges"):
+            for j, edge in enumerate(getattr(patch, list_name)):
+                if (edge.from_node, edge.to_node) == (element["from"], element["to"]):
+                    return ValidationIssue(path=[list_name, j, *rest], message=issue.message, code=issue.code)
+        label = f"edge '{element['from']}' -> '{element['to']}'"
+    else:
+        label = f"group '{element['id']}'"
+    return ValidationIssue(path=[label, *rest], message=issue.message, code=issue.code)
+
+def _build_prompt(base_spec: DiagramSpec, text: str, instruction: Optional[str], errors: Optional[str]) -> str:
+    change = ""
+    if text:
+        change += f"\n    New or changed source text:\n    {text}\n"
+    if instruction:
+        change += f"\n    Edit instruction:\n    {instruction}\n"
+    repair = f"\n    Your previous patch was rejected. Fix these errors (path: problem):\n    {errors}\n" if errors else ""
+    return f"""
+    You are editing an existing flowchart. Return ONLY a JSON patch describing the
+    minimal change; do not repeat unchanged nodes or edges.
+
+    Current diagram:
+    {_compact_spec(base_spec)}
+    {change}{repair}
+    Patch format (omit empty keys):
+    {{"remove_nodes": ["id"], "add_nodes": [{{"id": "...", "text": "...", "kind": "..."}}],
+      "update_nodes": [{{"id": "...", "text": "...", "kind": "..."}}],
+      "remove_edges": [{{"from": "...", "to": "..."}}], "add_edges": [{{"from": "...", "to": "...", "text": "..."}}],
+      "update_edges": [{{"from": "...", "to": "...", "text": "..."}}]}}
+
+    RULES:
+    1. JSON ONLY.
+    2. VALID `kind`: 'start', 'end', 'process', 'decision', 'data', 'note'.
+    3. New node ids must not clash with existing ones. Removing a node also removes its edges.
+    """
+
+def _patch_issues(error: ValidationError) -> List[ValidationIssue]:
+    return [
+        ValidationIssue(path=list(e["loc"]), message=e["msg"], code=e["type"])
+        for e in error.errors()
+    ]
+
+async def resolve_base_spec(base_spec: Optional[DiagramSpec], session_id: Optional[str]) -> Optional[DiagramSpec]:
+    """Returns the given base spec, or the latest spec saved in the session."""
+    if base_spec is not None:
+        return base_spec
+    if session_id:
+        history = await get_session_history(session_id, limit=1)
+        if history:
+            return DiagramSpec.parse_obj(history[0])
+    return None
+
+async def edit_diagram_spec(
+    base_spec: DiagramSpec,
+    text: str = "",
+    instruction: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> DiagramSpec:
+    """
+    Asks the LLM for a patch to `base_spec`, applies and validates it locally,
+    and returns the merged spec. Invalid patches are retried with the errors
+    listed by path, up to MAX_SCHEMA_RETRIES times.
+    """
+    errors: Optional[str] = None
+    for attempt in range(MAX_SCHEMA_RETRIES):
+        print(f"--- EDIT AGENT (Retry: {attempt}) ---")
+        response = await get_gemini_client().generate_json(_build_prompt(base_spec, text, instruction, errors), "")
+
+        try:
+            patch = SpecPatch.parse_obj(json.loads(response))
+            merged = apply_patch(base_spec, patch)
+        except json.JSONDecodeError as e:
+            issues = [ValidationIssue(path=[], message=f"Response is not valid JSON: {e}", code="json")]
+        except ValidationError as e:
+            issues = _patch_issues(e)
+        except PatchError as e:
+            issues = e.issues
+        else:
+            # The model only emitted a patch, so the merged spec may exceed the
+            # single-pass node limit (e.g. when editing a large diagram).
+            spec, issues = validate_diagram_spec(merged, large=True)
+            if spec is not None:
+                if session_id:
+                    await save_diagram_to_session(session_id, spec.dict(by_alias=True))
+                return spec
+            issues = [_locate_issue(issue, merged, patch) for issue in issues]
+
+        errors = format_validation_issues(issues)
+        print(f"Edit rejected with {len(issues)} error(s):\n{errors}")
+
+    raise DiagramGenerationError(f"Failed to produce a valid edit:\n{errors}")
@@ -1,20 +1,35 @@
 import os
-import google.generativeai as genai
+import threading
 from typing import List
 from dotenv import load_dotenv
 
 load_dotenv()
 
+_genai = None
+_genai_lock = threading.Lock()
+
+def _get_genai():
+    """Imports and configures the Gemini SDK once, on first use."""
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                api_key = os.getenv("GOOGLE_API_KEY")
+                if not api_key:
+                    raise ValueError("GOOGLE_API_KEY is not set.")
+
+                import google.generativeai as genai
+
+                genai.configure(api_key=api_key)
+                _genai = genai
+    return _genai
+
 def embed_text(text: str) -> List[float]:
     """
     Generates embeddings for a given text using Google's text-embedding-004 model.
     """
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY is not set.")
-    
-    genai.configure(api_key=api_key)
-    
+    genai = _get_genai()
+
     # Using the synchronous embed_content for simplicity in this service
     result = genai.embed_content(
         model="models/gemini-embedding-001",
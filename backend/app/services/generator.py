@@ -1,43 +1,35 @@
 import json
-import jsonschema
-import os
+import threading
 from typing import Dict, Any, List, TypedDict, Optional, Annotated
 import operator
 
-from app.models.spec import DiagramSpec
-from app.services.llm_client import gemini_client
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langgraph.graph import StateGraph, END
+from app.models.spec import MAX_NODES, DiagramSpec
+from app.services.llm_client import get_gemini_client
+from app.services.validation import ValidationIssue, format_validation_issues, validate_diagram_spec
 
 # --- LangGraph State Definition ---
 
 class AgentState(TypedDict):
     original_text: str
     rag_context: str
+    max_nodes: int
     session_id: Optional[str]
     session_history: Optional[str]
     extraction: Optional[Dict[str, Any]]
     diagram_spec: Optional[Dict[str, Any]]
-    validation_errors: Optional[str]
+    validation_errors: Optional[List[Dict[str, Any]]]
     critique_feedback: Optional[str]
     retry_count: int
     critique_count: int
     final_spec: Optional[DiagramSpec]
 
-# --- Constants & Schema ---
+# --- Constants ---
 
 MAX_SCHEMA_RETRIES = 3
 MAX_CRITIQUE_RETRIES = 1
 
-def load_schema():
-    try:
-        schema_path = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'shared', 'schema', 'diagram_spec.schema.json')
-        with open(os.path.normpath(schema_path), "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        raise RuntimeError(f"Schema file not found at: {schema_path}")
-
-DIAGRAM_SPEC_SCHEMA = load_schema()
+def _format_errors(errors: List[Dict[str, Any]]) -> str:
+    return format_validation_issues([ValidationIssue(**e) for e in errors])
 
 # --- Agent Nodes ---
 
@@ -59,7 +51,7 @@ async def extraction_agent(state: AgentState):
     Return a structured summary of the logic in JSON format.
     """
     
-    response = await gemini_client.generate_json(prompt, "")
+    response = await get_gemini_client().generate_json(prompt, "")
     extraction = json.loads(response)
     
     return {"extraction": extraction}
@@ -68,7 +60,17 @@ async def schema_agent(state: AgentState):
     """Converts extraction into a valid DiagramSpec JSON."""
     print(f"--- SCHEMA AGENT (Retry: {state['retry_count']}) ---")
     
-    repair_context = f"\nValidation Error to fix: {state['validation_errors']}" if state['validation_errors'] else ""
+    repair_context = ""
+    if state['validation_errors']:
+        # Show the model its previous attempt and every error by JSON path, so it
+        # can patch the exact fields instead of regenerating from scratch.
+        repair_context = f"""
+    Your previous attempt was invalid:
+    {json.dumps(state['diagram_spec'])}
+
+    Fix these errors (JSON path: problem):
+    {_format_errors(state['validation_errors'])}
+    """
     
     prompt = f"""
     Convert the following extraction into a valid `DiagramSpec` JSON object.
@@ -81,28 +83,27 @@ async def schema_agent(state: AgentState):
     2. VALID `kind`: 'start', 'end', 'process', 'decision', 'data', 'note'.
     3. Use `text` for labels, NOT `label`.
     4. Use `from` and `to` for edges.
+    5. Use at most {state['max_nodes']} nodes.
     """
     
-    response = await gemini_client.generate_json(prompt, "")
+    response = await get_gemini_client().generate_json(prompt, "")
     diagram_spec = json.loads(response)
     
     return {"diagram_spec": diagram_spec, "validation_errors": None}
 
 async def validation_agent(state: AgentState):
-    """Validates the DiagramSpec against Pydantic and JSON Schema."""
+    """Validates the DiagramSpec against the JSON Schema and its semantic rules."""
     print("--- VALIDATION AGENT ---")
-    spec_data = state['diagram_spec']
-    
-    try:
-        # JSON Schema validation
-        jsonschema.validate(instance=spec_data, schema=DIAGRAM_SPEC_SCHEMA)
-        # Pydantic validation
-        spec = DiagramSpec(**spec_data)
+    spec, issues = validate_diagram_spec(state['diagram_spec'], max_nodes=state['max_nodes'])
+
+    if spec is not None:
         return {"final_spec": spec, "validation_errors": None}
-    except Exception as e:
-        error_msg = f"{type(e).__name__}: {str(e)}"
-        print(f"Validation failed: {error_msg}")
-        return {"validation_errors": error_msg, "retry_count": state['retry_count'] + 1}
+
+    print(f"Validation failed with {len(issues)} error(s):\n{format_validation_issues(issues)}")
+    return {
+        "validation_errors": [issue.dict() for issue in issues],
+        "retry_count": state['retry_count'] + 1
+    }
 
 async def critique_agent(state: AgentState):
     """Critiques the diagram for accuracy and completeness."""
@@ -118,7 +119,7 @@ async def critique_agent(state: AgentState):
     Return a JSON object: {{"satisfied": true/false, "feedback": "..."}}
     """
     
-    response = await gemini_client.generate_json(prompt, "")
+    response = await get_gemini_client().generate_json(prompt, "")
     critique = json.loads(response)
     
     if critique.get("satisfied"):
@@ -146,38 +147,55 @@ def should_continue_extraction(state: AgentState):
 
 # --- Graph Setup ---
 
-workflow = StateGraph(AgentState)
+# The graph is compiled on first use (or by the startup warm-up) so that
+# importing this module does not pull in LangGraph.
+_app_graph = None
+_app_graph_lock = threading.Lock()
 
-workflow.add_node("extraction", extraction_agent)
-workflow.add_node("schema", schema_agent)
-workflow.add_node("validation", validation_agent)
-workflow.add_node("critique", critique_agent)
+def _build_graph():
+    from langgraph.graph import StateGraph, END
 
-workflow.set_entry_point("extraction")
+    workflow = StateGraph(AgentState)
 
-workflow.add_edge("extraction", "schema")
-workflow.add_edge("schema", "validation")
+    workflow.add_node("extraction", extraction_agent)
+    workflow.add_node("schema", schema_agent)
+    workflow.add_node("validation", validation_agent)
+    workflow.add_node("critique", critique_agent)
 
-workflow.add_conditional_edges(
-    "validation",
-    should_continue_schema,
-    {
-        "schema": "schema",
-        "critique": "critique",
-        "fail": END
-    }
-)
-
-workflow.add_conditional_edges(
-    "critique",
-    should_continue_extraction,
-    {
-        "extraction": "extraction",
-        "end": END
-    }
-)
+    workflow.set_entry_point("extraction")
+
+    workflow.add_edge("extraction", "schema")
+    workflow.add_edge("schema", "validation")
 
-app_graph = workflow.compile()
+    workflow.add_conditional_edges(
+        "validation",
+        should_continue_schema,
+        {
+            "schema": "schema",
+            "critique": "critique",
+            "fail": END
+        }
+    )
+
+    workflow.add_conditional_edges(
+        "critique",
+        should_continue_extraction,
+        {
+            "extraction": "extraction",
+            "end": END
+        }
+    )
+
+    return workflow.compile()
+
+def get_app_graph():
+    """Returns the compiled multi-agent workflow, compiling it on first use."""
+    global _app_graph
+    if _app_graph is None:
+        with _app_graph_lock:
+            if _app_graph is None:
+                _app_graph = _build_graph()
+    return _app_graph
 
 # --- Main Entry Point ---
 
@@ -186,20 +204,15 @@ class DiagramGenerationError(Exception):
 
 from app.core.database import get_session_history, save_diagram_to_session
 
-async def generate_diagram_spec(text: str, context: str = "", session_id: str = None) -> DiagramSpec:
+async def run_workflow(text: str, context: str = "", session_id: str = None, history_text: str = "", tags: Optional[List[str]] = None, max_nodes: int = MAX_NODES) -> DiagramSpec:
     """
-    Invokes the LangGraph multi-agent workflow to generate a DiagramSpec.
+    Runs the LangGraph multi-agent workflow once and returns the validated spec
+    of at most `max_nodes` nodes. Does not read or write session history.
     """
-    # Load session history if session_id is provided
-    history_text = ""
-    if session_id:
-        history = await get_session_history(session_id)
-        if history:
-            history_text = json.dumps(history, indent=2)
-
     initial_state: AgentState = {
         "original_text": text,
         "rag_context": context,
+        "max_nodes": max_nodes,
         "session_id": session_id,
         "session_history": history_text,
         "extraction": None,
@@ -214,22 +227,17 @@ async def generate_diagram_spec(text: str, context: str = "", session_id: str =
     try:
         # LangSmith tracing configuration
         config = {
-            "tags": [f"session:{session_id}" if session_id else "no-session"],
+            "tags": [f"session:{session_id}" if session_id else "no-session"] + (tags or []),
             "metadata": {"text_len": len(text)}
         }
         
-        final_state = await app_graph.ainvoke(initial_state, config=config)
+        final_state = await get_app_graph().ainvoke(initial_state, config=config)
         
         if final_state.get("final_spec"):
-            spec = final_state["final_spec"]
-            # Save to session history if successful
-            if session_id:
-                await save_diagram_to_session(session_id, spec.dict())
-            
-            return spec
+            return final_state["final_spec"]
         
         if final_state.get("validation_errors"):
-            raise DiagramGenerationError(f"Failed to generate valid schema: {final_state['validation_errors']}")
+            raise DiagramGenerationError(f"Failed to generate valid schema:\n{_format_errors(final_state['validation_errors'])}")
             
         raise DiagramGenerationError("Diagram generation failed to produce a valid result.")
         
@@ -238,3 +246,22 @@ async def generate_diagram_spec(text: str, context: str = "", session_id: str =
             raise
         print(f"Error in multi-agent workflow: {e}")
         raise DiagramGenerationError(f"An error occurred during multi-agent generation: {str(e)}")
+
+async def generate_diagram_spec(text: str, context: str = "", session_id: str = None) -> DiagramSpec:
+    """
+    Invokes the LangGraph multi-agent workflow to generate a DiagramSpec.
+    """
+    # Load session history if session_id is provided
+    history_text = ""
+    if session_id:
+        history = await get_session_history(session_id)
+        if history:
+            history_text = json.dumps(history, indent=2)
+
+    spec = await run_workflow(text, context=context, session_id=session_id, history_text=history_text)
+
+    # Save to session history if successful
+    if session_id:
+        await save_diagram_to_session(session_id, spec.dict(by_alias=True))
+
+    return spec
@@ -0,0 +1,207 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from app.core.admission import AdmissionRejected, generation_gate
+from app.core.config import settings
+from app.core.database import save_diagram_to_session
+from app.models.spec import MAX_DIAGRAM_NODES, MAX_NODES, DiagramSpec
+from app.services.generator import DiagramGenerationError, run_workflow
+from app.services.ingestion import chunk_text
+from app.services.llm_client import get_gemini_client
+from app.services.validation import format_validation_issues, validate_diagram_spec
+
+# --- Large-diagram generation ---
+#
+# A single generation pass is capped at MAX_NODES. Long documents are split
+# into sections; each section becomes a Group, generated as its own subgraph
+# by the regular workflow, with the sections running concurrently. The
+# subgraphs are then stitched together with cross-group edges. The layout
+# engine places each group as a compound node.
+#
+# Every section pass takes its own generation_gate slot, so a large request
+# is bounded by the same concurrency limit as the equivalent single requests.
+
+SECTION_TOKENS = 400
+MAX_SECTION_TOKENS = 4 * SECTION_TOKENS
+MAX_SECTIONS = 20
+
+class DocumentTooLargeError(DiagramGenerationError):
+    """Raised before any LLM call when the text needs more than MAX_SECTIONS sections."""
+    pass
+
+class Section(BaseModel):
+    group_id: str
+    title: str
+    text: str
+    nodes: List[Dict[str, Any]] = []
+    edges: List[Dict[str, Any]] = []
+
+    def entries(self) -> List[str]:
+        """Node ids with no incoming edge inside the section, start nodes first."""
+        targets = {e["to"] for e in self.edges}
+        candidates = [n for n in self.nodes if n["id"] not in targets] or self.nodes[:1]
+        return [n["id"] for n in sorted(candidates, key=lambda n: n["kind"] != "start")]
+
+    def exits(self) -> List[str]:
+        """Node ids with no outgoing edge inside the section, end nodes first."""
+        sources = {e["from"] for e in self.edges}
+        candidates = [n for n in self.nodes if n["id"] not in sources] or self.nodes[-1:]
+        return [n["id"] for n in sorted(candidates, key=lambda n: n["kind"] != "end")]
+
+def partition_text(text: str, section_tokens: int = SECTION_TOKENS, max_sections: int = MAX_SECTIONS) -> List[str]:
+    """
+    Splits text into paragraph-aligned sections, growing them up to
+    MAX_SECTION_TOKENS until there are at most `max_sections`. Raises
+    DocumentTooLargeError if the text does not fit.
+    """
+    sections = chunk_text(text, max_tokens=section_tokens)
+    while len(sections) > max_sections and section_tokens < MAX_SECTION_TOKENS:
+        section_tokens = min(2 * section_tokens, MAX_SECTION_TOKENS)
+        sections = chunk_text(text, max_tokens=section_tokens)
+    if len(sections) > max_sections:
+        raise DocumentTooLargeError(
+            f"The text is too long for one diagram: it needs {len(sections)} sections; maximum is {max_sections}."
+        )
+    return sections
+
+def section_node_budget(num_sections: int) -> int:
+    """Nodes each section may use so the stitched diagram stays within MAX_DIAGRAM_NODES."""
+    return min(MAX_NODES, MAX_DIAGRAM_NODES // max(1, num_sections))
+
+def _section_title(text: str, max_len: int = 60) -> str:
+    first_line = text.strip().split("\n", 1)[0]
+    first_sentence = first_line.split(". ", 1)[0].rstrip(".")
+    return first_sentence if len(first_sentence) <= max_len else first_sentence[:max_len - 3].rstrip() + "..."
+
+async def generate_section_spec(section_text: str, context: str, index: int, max_nodes: int = MAX_NODES) -> DiagramSpec:
+    """Generates one section's subgraph of at most `max_nodes` nodes with the regular multi-agent workflow."""
+    return await run_workflow(section_text, context=context, tags=[f"section:{index}"], max_nodes=max_nodes)
+
+def _namespace(section: Section, spec: DiagramSpec):
+    """Copies a section's spec into the section, prefixing ids so sections cannot clash."""
+    prefix = f"{section.group_id}_"
+    section.nodes = [{"id": prefix + n.id, "text": n.text, "kind": n.kind.value} for n in spec.nodes]
+    section.edges = [
+        {"from": prefix + e.from_node, "to": prefix + e.to_node, **({"text": e.text} if e.text else {})}
+        for e in spec.edges
+    ]
+
+def _sequential_edges(sections: List[Section]) -> List[Dict[str, Any]]:
+    """Fallback stitching: links each section's main exit to the next section's main entry."""
+    return [
+        {"from": current.exits()[0], "to": following.entries()[0]}
+        for current, following in zip(sections, sections[1:])
+        if current.nodes and following.nodes
+    ]
+
+async def propose_cross_edges(sections: List[Section]) -> List[Dict[str, Any]]:
+    """
+    Asks the LLM which sections connect, showing only each section's entry and
+    exit nodes so the prompt stays small however large the sections are.
+    Edges that do not join an exit to an entry of another section are dropped;
+    if none remain, the sections are chained in document order.
+    """
+    listing = []
+    for s in sections:
+        texts = {n["id"]: n["text"] for n in s.nodes}
+        listing.append(
+            f"Group {s.group_id} ({s.title}):\n"
+            f"  entries: " + "; ".join(f"{i} = {texts[i]}" for i in s.entries()) + "\n"
+            f"  exits: " + "; ".join(f"{i} = {texts[i]}" for i in s.exits())
+        )
+    prompt = f"""
+    A long process was split into groups, in document order. Connect the groups:
+    return the edges from an exit node of one group to an entry node of another
+    that reflect the flow of the process (including branches and loops back).
+
+    {chr(10).join(listing)}
+
+    Return a JSON object: {{"edges": [{{"from": "exit id", "to": "entry id", "text": "optional label"}}]}}
+    """
+    group_of = {n["id"]: s.group_id for s in sections for n in s.nodes}
+    exits = {i for s in sections for i in s.exits()}
+    entries = {i for s in sections for i in s.entries()}
+    try:
+        response = await get_gemini_client().generate_json(prompt, "")
+        proposed = json.loads(response).get("edges", [])
+    except Exception as e:
+        print(f"Cross-group stitching failed, chaining groups in order: {e}")
+        return _sequential_edges(sections)
+
+    edges = []
+    for e in proposed if isinstance(proposed, list) else []:
+        if not isinstance(e, dict):
+            continue
+        source, target = e.get("from"), e.get("to")
+        if source in exits and target in entries and group_of[source] != group_of[target]:
+            edge = {"from": source, "to": target}
+            if isinstance(e.get("text"), str) and e["text"]:
+                edge["text"] = e["text"]
+            edges.append(edge)
+    return edges or _sequential_edges(sections)
+
+async def generate_large_diagram_spec(text: str, context: str = "", session_id: Optional[str] = None) -> DiagramSpec:
+    """
+    Generates a diagram of up to MAX_DIAGRAM_NODES nodes by partitioning the
+    text into groups, generating each group concurrently, and stitching the
+    groups together with cross-group edges. Raises AdmissionRejected if a
+    section cannot get a generation slot.
+    """
+    sections = [
+        Section(group_id=f"g{i + 1}", title=_section_title(chunk), text=chunk)
+        for i, chunk in enumerate(partition_text(text))
+    ]
+    if not sections:
+        raise DiagramGenerationError("The text is empty.")
+    budget = section_node_budget(len(sections))
+    print(f"--- LARGE DIAGRAM: {len(sections)} groups of up to {budget} nodes ---")
+
+    semaphore = asyncio.Semaphore(settings.LARGE_DIAGRAM_CONCURRENCY)
+
+    async def generate(index: int, section: Section):
+        async with semaphore, generation_gate.slot():
+            _namespace(section, await generate_section_spec(section.text, context, index, budget))
+
+    # The first failure or rejection cancels the remaining sections, so no
+    # more quota is spent on a diagram that cannot be completed.
+    tasks = [asyncio.create_task(generate(i, s)) for i, s in enumerate(sections)]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        for task in tasks:
+            task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    errors = [(s, t.exception()) for s, t in zip(sections, tasks) if t in done and t.exception() is not None]
+    rejected = [e for _, e in errors if isinstance(e, AdmissionRejected)]
+    if rejected:
+        raise rejected[0]
+    if errors:
+        failures = [f"{s.group_id}: {e}" for s, e in errors]
+        if pending:
+            failures.append(f"{len(pending)} other group(s) cancelled.")
+        raise DiagramGenerationError("Failed to generate some groups:\n" + "\n".join(failures))
+
+    cross_edges = []
+    if len(sections) > 1:
+        async with generation_gate.slot():
+            cross_edges = await propose_cross_edges(sections)
+
+    merged = {
+        "nodes": [n for s in sections for n in s.nodes],
+        "edges": [e for s in sections for e in s.edges] + cross_edges,
+        "groups": [
+            {"id": s.group_id, "text": s.title, "node_ids": [n["id"] for n in s.nodes]}
+            for s in sections
+        ],
+    }
+    spec, issues = validate_diagram_spec(merged, large=True)
+    if spec is None:
+        raise DiagramGenerationError(f"Stitched diagram is invalid:\n{format_validation_issues(issues)}")
+
+    if session_id:
+        await save_diagram_to_session(session_id, spec.dict(by_alias=True))
+    return spec
@@ -1,51 +1,65 @@
 import subprocess
-import json
 import os
+import shutil
+import orjson
 from app.models.spec import DiagramSpec, LayoutSpec, LayoutConstraints
 from typing import Optional
 
+NODE_SCRIPT_PATH = os.path.normpath(
+    os.path.join(os.path.dirname(__file__), '..', '..', 'tools', 'layout_engine.js')
+)
+TOOLS_DIR = os.path.dirname(NODE_SCRIPT_PATH)
+
 class LayoutError(Exception):
     """Custom exception for layout service errors."""
     pass
 
+def _check_layout_files():
+    if not os.path.exists(NODE_SCRIPT_PATH):
+        raise FileNotFoundError(f"Layout engine script not found at: {NODE_SCRIPT_PATH}")
+
+    if not os.path.exists(os.path.join(TOOLS_DIR, 'node_modules')):
+        raise FileNotFoundError(f"node_modules not found in {TOOLS_DIR}. Please run 'npm install' in that directory.")
+
+def check_layout_engine() -> str:
+    """
+    Readiness probe: verifies the layout engine can be started, without running it.
+    Returns the path of the Node.js runtime, or raises.
+    """
+    _check_layout_files()
+    node_path = shutil.which('node')
+    if node_path is None:
+        raise LayoutError("The 'node' runtime was not found in PATH.")
+    return node_path
+
 def calculate_layout(spec: DiagramSpec, constraints: Optional[LayoutConstraints] = None) -> LayoutSpec:
     """
     Calculates the layout for a DiagramSpec by calling the Node.js layout engine.
     """
-    node_script_path = os.path.normpath(
-        os.path.join(os.path.dirname(__file__), '..', '..', 'tools', 'layout_engine.js')
-    )
-    tools_dir = os.path.dirname(node_script_path)
-
-    if not os.path.exists(node_script_path):
-        raise FileNotFoundError(f"Layout engine script not found at: {node_script_path}")
-    
-    if not os.path.exists(os.path.join(tools_dir, 'node_modules')):
-        raise FileNotFoundError(f"node_modules not found in {tools_dir}. Please run 'npm install' in that directory.")
+    _check_layout_files()
 
-    # Construct the payload for the Node.js script
+    # Construct the payload for the Node.js script. The models are dumped to
+    # dicts once and encoded straight to bytes, without a JSON string round trip.
     payload = {
-        "diagram_spec": json.loads(spec.json(by_alias=True)),
-        "constraints": json.loads(constraints.json(by_alias=True, exclude_none=True)) if constraints else None,
+        "diagram_spec": spec.dict(by_alias=True),
+        "constraints": constraints.dict(by_alias=True, exclude_none=True) if constraints else None,
     }
-    input_json = json.dumps(payload)
+    input_bytes = orjson.dumps(payload)
     
     try:
         process = subprocess.Popen(
-            ['node', node_script_path],
+            ['node', NODE_SCRIPT_PATH],
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
-            cwd=tools_dir
+            cwd=TOOLS_DIR
         )
-        stdout, stderr = process.communicate(input=input_json)
+        stdout, stderr = process.communicate(input=input_bytes)
         
         if process.returncode != 0:
-            raise LayoutError(f"Layout engine script exited with error code {process.returncode}:\n{stderr}")
+            raise LayoutError(f"Layout engine script exited with error code {process.returncode}:\n{stderr.decode('utf-8', errors='replace')}")
             
-        layout_data = json.loads(stdout)
-        return LayoutSpec(**layout_data)
+        return LayoutSpec.parse_obj(orjson.loads(stdout))
 
     except FileNotFoundError:
         raise LayoutError("The 'node' runtime was not found. Please ensure Node.js is installed and accessible in your system's PATH.")
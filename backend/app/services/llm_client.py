@@ -1,5 +1,6 @@
 import os
-import google.generativeai as genai
+import threading
+from typing import Optional
 from dotenv import load_dotenv
 
 # Load environment variables from a .env file in the `backend` directory
@@ -11,7 +12,11 @@ class GeminiClient:
         api_key = os.getenv("GOOGLE_API_KEY")
         if not api_key:
             raise ValueError("The GOOGLE_API_KEY environment variable is not set. Please add it to a .env file in the `backend` directory.")
-        
+
+        # Imported here so that importing this module stays cheap; the SDK is
+        # only loaded once the client is actually needed.
+        import google.generativeai as genai
+
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel(model_name)
         print("Gemini client initialized.")
@@ -55,10 +60,16 @@ class GeminiClient:
             text = text[:-3]
         return text.strip()
 
-# Create a singleton instance of the client to be used across the application.
-# This avoids re-initializing the client on every request.
-try:
-    gemini_client = GeminiClient()
-except ValueError as e:
-    print(f"Could not initialize Gemini client: {e}")
-    gemini_client = None
+# A single client instance is shared across the application. It is created
+# lazily on first use (or by the startup warm-up) rather than at import time.
+_gemini_client: Optional[GeminiClient] = None
+_gemini_client_lock = threading.Lock()
+
+def get_gemini_client() -> GeminiClient:
+    """Returns the shared Gemini client, initializing it on first use."""
+    global _gemini_client
+    if _gemini_client is None:
+        with _gemini_client_lock:
+            if _gemini_client is None:
+                _gemini_client = GeminiClient()
+    return _gemini_client
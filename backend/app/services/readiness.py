@@ -0,0 +1,57 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from app.core.database import check_db
+from app.services.generator import get_app_graph
+from app.services.layout import check_layout_engine
+from app.services.llm_client import get_gemini_client
+from app.services.vector_store import check_vector_store
+
+async def _run_sync(fn: Callable[[], Any]) -> Any:
+    # Heavy initializers (chromadb, the Gemini SDK, LangGraph) block, so they
+    # run in a worker thread to keep the event loop responsive.
+    return await asyncio.to_thread(fn)
+
+def _probes() -> Dict[str, Callable[[], Awaitable[Any]]]:
+    return {
+        "database": check_db,
+        "vector_store": lambda: _run_sync(check_vector_store),
+        "llm_client": lambda: _run_sync(get_gemini_client),
+        "agent_graph": lambda: _run_sync(get_app_graph),
+        "layout_engine": lambda: _run_sync(check_layout_engine),
+    }
+
+async def _probe(name: str, check: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        await check()
+        status = {"ready": True}
+    except Exception as e:
+        status = {"ready": False, "error": f"{type(e).__name__}: {e}"}
+    status["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return status
+
+async def readiness_report() -> Dict[str, Any]:
+    """
+    Runs every readiness probe concurrently. A probe initializes its service if
+    that has not happened yet, so the first call may be slow; later calls are cheap.
+    """
+    probes = _probes()
+    results = await asyncio.gather(*(_probe(name, check) for name, check in probes.items()))
+    components = dict(zip(probes.keys(), results))
+    return {
+        "ready": all(c["ready"] for c in components.values()),
+        "components": components,
+    }
+
+async def warm_up():
+    """Initializes heavy services in the background after startup."""
+    started = time.perf_counter()
+    report = await readiness_report()
+    elapsed = time.perf_counter() - started
+    not_ready = [name for name, c in report["components"].items() if not c["ready"]]
+    if not_ready:
+        print(f"Warm-up finished in {elapsed:.2f}s; not ready: {', '.join(not_ready)}")
+    else:
+        print(f"Warm-up finished in {elapsed:.2f}s; all services ready.")
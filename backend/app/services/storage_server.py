@@ -0,0 +1,101 @@
+"""
+Storage service: the single process that owns ChromaDB and the SQLite session
+database when the API runs with several workers.
+
+Start it before the web workers and point them at the same address:
+
+    python -m app.services.storage_server --address unix:/tmp/flowra-storage.sock
+    STORAGE_SERVICE_ADDRESS=unix:/tmp/flowra-storage.sock uvicorn app.main:app --workers 4
+
+See app.core.storage_client for the wire format.
+"""
+import argparse
+import asyncio
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict
+
+from app.core import storage_client
+from app.core.config import settings
+
+# Must run before any storage call so this process uses its own files
+# instead of forwarding to STORAGE_SERVICE_ADDRESS (i.e. to itself).
+storage_client.use_local_storage()
+
+from app.core.database import check_db, get_session_history_raw, init_db, save_diagram_json
+from app.services.vector_store import add_chunk, check_vector_store, query_chunks
+
+def _in_thread(fn: Callable[..., Any]) -> Callable[..., Awaitable[Any]]:
+    # Chroma calls block; run them off the event loop so other connections
+    # keep being served.
+    async def run(**args):
+        return await asyncio.to_thread(fn, **args)
+    return run
+
+OPERATIONS: Dict[str, Callable[..., Awaitable[Any]]] = {
+    "check_db": check_db,
+    "save_diagram": save_diagram_json,
+    "get_history_raw": get_session_history_raw,
+    "check_vector_store": _in_thread(check_vector_store),
+    "add_chunk": _in_thread(add_chunk),
+    "query_chunks": _in_thread(query_chunks),
+}
+
+async def _dispatch(line: bytes) -> Dict[str, Any]:
+    try:
+        request = json.loads(line)
+        op = OPERATIONS.get(request.get("op"))
+        if op is None:
+            return {"ok": False, "error": f"Unknown operation '{request.get('op')}'."}
+        result = await op(**request.get("args", {}))
+        return {"ok": True, "result": result}
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Serves requests on one pooled client connection until it is closed."""
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            response = await _dispatch(line)
+            writer.write(json.dumps(response).encode("utf-8") + b"\n")
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(address: str):
+    await init_db()
+
+    parsed = storage_client.parse_address(address)
+    # Lines carry whole embeddings, so raise the default 64 KiB line limit.
+    limit = 16 * 1024 * 1024
+    if isinstance(parsed, str):
+        if os.path.exists(parsed):
+            os.unlink(parsed)
+        server = await asyncio.start_unix_server(handle_connection, path=parsed, limit=limit)
+    else:
+        host, port = parsed
+        server = await asyncio.start_server(handle_connection, host=host, port=port, limit=limit)
+
+    print(f"Storage service listening on {address}")
+    async with server:
+        await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the storage service for multi-worker deployments.")
+    parser.add_argument(
+        "--address",
+        default=settings.STORAGE_SERVICE_ADDRESS,
+        help="'unix:/path/to.sock' or 'host:port'. Defaults to STORAGE_SERVICE_ADDRESS.",
+    )
+    args = parser.parse_args()
+    if not args.address:
+        parser.error("No address given and STORAGE_SERVICE_ADDRESS is not set.")
+    asyncio.run(serve(args.address))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import hashlib
+import threading
+import zipfile
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+
+from app.models.spec import LayoutNode, LayoutSpec, NodeKind
+
+# --- SVG export ---
+#
+# Renders a LayoutSpec to minified SVG as a stream of chunks, so large
+# diagrams and batch exports never need the whole document in one string.
+# Rendered output is cached by layout_hash, which doubles as the ETag.
+
+MARGIN = 25
+FONT_SIZE = 12
+LINE_HEIGHT = 15
+CHUNK_SIZE = 64 * 1024
+
+NODE_FILL = {
+    NodeKind.START: "#e8f5e9",
+    NodeKind.END: "#fdecea",
+    NodeKind.PROCESS: "#fff",
+    NodeKind.DECISION: "#fff8e1",
+    NodeKind.DATA: "#e3f2fd",
+    NodeKind.NOTE: "#fffde7",
+}
+
+_XML_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"})
+
+def escape(text: str) -> str:
+    """Escapes text for use in SVG element content and attribute values."""
+    return text.translate(_XML_ESCAPES)
+
+def _num(value: float) -> str:
+    """Formats a coordinate with at most two decimals and no trailing zeros."""
+    # Layout coordinates are mostly whole numbers; skip float formatting for those.
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    text = f"{value:.2f}".rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+# --- Bounds ---
+
+def _group_boxes(layout: LayoutSpec) -> Dict[str, Tuple[float, float, float, float]]:
+    """Group boxes as (x, y, width, height): from the layout engine, or around the members."""
+    boxes = {}
+    if not layout.groups:
+        return boxes
+    nodes = {n.id: n for n in layout.nodes}
+    for group in layout.groups:
+        if None not in (group.x, group.y, group.width, group.height):
+            boxes[group.id] = (group.x, group.y, group.width, group.height)
+            continue
+        members = [nodes[i] for i in group.node_ids if i in nodes]
+        if not members:
+            continue
+        pad = 15
+        x0 = min(n.x for n in members) - pad
+        y0 = min(n.y for n in members) - pad - LINE_HEIGHT
+        x1 = max(n.x + n.width for n in members) + pad
+        y1 = max(n.y + n.height for n in members) + pad
+        boxes[group.id] = (x0, y0, x1 - x0, y1 - y0)
+    return boxes
+
+def compute_bounds(layout: LayoutSpec, group_boxes: Dict[str, Tuple[float, float, float, float]]) -> Tuple[float, float, float, float]:
+    """The (min_x, min_y, max_x, max_y) box covering nodes, edge routes and groups."""
+    xs: List[float] = []
+    ys: List[float] = []
+    for n in layout.nodes:
+        xs += (n.x, n.x + n.width)
+        ys += (n.y, n.y + n.height)
+    for e in layout.edges:
+        for px, py in e.points:
+            xs.append(px)
+            ys.append(py)
+    for x, y, w, h in group_boxes.values():
+        xs += (x, x + w)
+        ys += (y, y + h)
+    if not xs:
+        return 0.0, 0.0, 0.0, 0.0
+    return min(xs), min(ys), max(xs), max(ys)
+
+# --- Elements ---
+
+def _node_shape(node: LayoutNode) -> str:
+    x, y, w, h = node.x, node.y, node.width, node.height
+    style = f'fill="{NODE_FILL.get(node.kind, "#fff")}"'
+    if node.kind in (NodeKind.START, NodeKind.END):
+        return f'<rect x="{_num(x)}" y="{_num(y)}" width="{_num(w)}" height="{_num(h)}" rx="{_num(h / 2)}" {style}/>'
+    if node.kind == NodeKind.DECISION:
+        points = f"{_num(x + w / 2)},{_num(y)} {_num(x + w)},{_num(y + h / 2)} {_num(x + w / 2)},{_num(y + h)} {_num(x)},{_num(y + h / 2)}"
+        return f'<polygon points="{points}" {style}/>'
+    if node.kind == NodeKind.DATA:
+        skew = min(15, w / 6)
+        points = f"{_num(x + skew)},{_num(y)} {_num(x + w)},{_num(y)} {_num(x + w - skew)},{_num(y + h)} {_num(x)},{_num(y + h)}"
+        return f'<polygon points="{points}" {style}/>'
+    if node.kind == NodeKind.NOTE:
+        fold = min(12, w / 4, h / 4)
+        d = (f"M{_num(x)},{_num(y)}H{_num(x + w - fold)}L{_num(x + w)},{_num(y + fold)}"
+             f"V{_num(y + h)}H{_num(x)}ZM{_num(x + w - fold)},{_num(y)}V{_num(y + fold)}H{_num(x + w)}")
+        return f'<path d="{d}" {style}/>'
+    return f'<rect x="{_num(x)}" y="{_num(y)}" width="{_num(w)}" height="{_num(h)}" rx="5" {style}/>'
+
+def _text(x: float, y: float, text: str, css_class: str = "") -> str:
+    """Centered text; each line of `text` becomes a tspan."""
+    lines = text.split("\n")
+    cls = f' class="{css_class}"' if css_class else ""
+    if len(lines) == 1:
+        return f'<text x="{_num(x)}" y="{_num(y)}"{cls}>{escape(text)}</text>'
+    first_dy = -(len(lines) - 1) * LINE_HEIGHT / 2
+    spans = "".join(
+        f'<tspan x="{_num(x)}" dy="{_num(first_dy if i == 0 else LINE_HEIGHT)}">{escape(line)}</tspan>'
+        for i, line in enumerate(lines)
+    )
+    return f'<text x="{_num(x)}" y="{_num(y)}"{cls}>{spans}</text>'
+
+def _header(min_x: float, min_y: float, max_x: float, max_y: float) -> str:
+    vx, vy = min_x - MARGIN, min_y - MARGIN
+    width, height = max_x - min_x + 2 * MARGIN, max_y - min_y + 2 * MARGIN
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{_num(width)}" height="{_num(height)}" '
+        f'viewBox="{_num(vx)} {_num(vy)} {_num(width)} {_num(height)}">'
+        '<defs><marker id="a" markerWidth="10" markerHeight="7" refX="10" refY="3.5" orient="auto">'
+        '<polygon points="0 0,10 3.5,0 7" fill="#333"/></marker></defs>'
+        f'<style>text{{font-family:sans-serif;font-size:{FONT_SIZE}px;text-anchor:middle;dominant-baseline:middle}}'
+        '.n{stroke:#333;stroke-width:2}.e{stroke:#333;stroke-width:2;fill:none}'
+        '.g{fill:#f6f6f6;stroke:#bbb;stroke-dasharray:6 4}.gl{font-weight:bold;fill:#666}.el{fill:#555;font-size:11px}</style>'
+    )
+
+def _elements(layout: LayoutSpec, group_boxes: Dict[str, Tuple[float, float, float, float]]) -> Iterator[str]:
+    # Groups first so they sit behind nodes and edges.
+    for group in layout.groups or []:
+        box = group_boxes.get(group.id)
+        if box is None:
+            continue
+        x, y, w, h = box
+        yield f'<rect class="g" x="{_num(x)}" y="{_num(y)}" width="{_num(w)}" height="{_num(h)}" rx="8"/>'
+        yield _text(x + w / 2, y + LINE_HEIGHT, group.text, "gl")
+
+    for edge in layout.edges:
+        if not edge.points:
+            continue
+        d = "M" + "L".join(f"{_num(px)},{_num(py)}" for px, py in edge.points)
+        yield f'<path class="e" d="{d}" marker-end="url(#a)"/>'
+        if edge.text:
+            # Label the middle of the route.
+            mid = len(edge.points) // 2
+            (x0, y0), (x1, y1) = edge.points[max(0, mid - 1)], edge.points[mid]
+            yield _text((x0 + x1) / 2, (y0 + y1) / 2 - 8, edge.text, "el")
+
+    for node in layout.nodes:
+        yield '<g class="n">' + _node_shape(node) + "</g>"
+        yield _text(node.x + node.width / 2, node.y + node.height / 2, node.text)
+
+def render_svg(layout: LayoutSpec) -> Iterator[bytes]:
+    """Streams the SVG for `layout` as UTF-8 chunks of roughly CHUNK_SIZE bytes."""
+    group_boxes = _group_boxes(layout)
+    buffer = [_header(*compute_bounds(layout, group_boxes))]
+    size = len(buffer[0])
+    for element in _elements(layout, group_boxes):
+        buffer.append(element)
+        size += len(element)
+        if size >= CHUNK_SIZE:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+    buffer.append("</svg>")
+    yield "".join(buffer).encode("utf-8")
+
+# --- Cache ---
+
+def layout_hash(layout: LayoutSpec) -> str:
+    """
+    A content hash of everything the SVG depends on, used as cache key and ETag.
+    Reads the fields directly: `layout.dict()` alone costs more than rendering.
+    """
+    data = [
+        [(n.id, n.text, n.kind.value, n.x, n.y, n.width, n.height) for n in layout.nodes],
+        [(e.from_node, e.to_node, e.text, e.points) for e in layout.edges],
+        [(g.id, g.text, g.node_ids, g.x, g.y, g.width, g.height) for g in layout.groups or []],
+        layout.style,
+    ]
+    return hashlib.sha256(orjson.dumps(data)).hexdigest()
+
+class SVGCache:
+    """An LRU cache of rendered SVG bytes, bounded by total size."""
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            svg = self._entries.get(key)
+            if svg is not None:
+                self._entries.move_to_end(key)
+            return svg
+
+    def put(self, key: str, svg: bytes):
+        if len(svg) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = svg
+            self._size += len(svg)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+svg_cache = SVGCache()
+
+def export_svg_stream(layout: LayoutSpec, key: Optional[str] = None) -> Iterator[bytes]:
+    """Yields the SVG for `layout`, from the cache if possible, caching it once fully rendered."""
+    key = key or layout_hash(layout)
+    cached = svg_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+    chunks = []
+    for chunk in render_svg(layout):
+        chunks.append(chunk)
+        yield chunk
+    svg_cache.put(key, b"".join(chunks))
+
+# --- Batch export ---
+
+class _ZipSink:
+    """A write-only, non-seekable file for zipfile that hands written bytes to a generator."""
+    def __init__(self):
+        self._pending: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._pending.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> Iterator[bytes]:
+        if self._pending:
+            data = b"".join(self._pending)
+            self._pending = []
+            yield data
+
+def export_zip_stream(entries: Iterable[Tuple[str, LayoutSpec]]) -> Iterator[bytes]:
+    """Streams a zip archive with one SVG file per (file name, layout) entry."""
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=5) as archive:
+        for name, layout in entries:
+            with archive.open(name, "w") as member:
+                for chunk in export_svg_stream(layout):
+                    member.write(chunk)
+                    yield from sink.drain()
+            yield from sink.drain()
+    yield from sink.drain()
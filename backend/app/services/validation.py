@@ -0,0 +1,209 @@
+import copy
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from jsonschema import Draft7Validator
+from pydantic import BaseModel
+
+from app.models.spec import MAX_DIAGRAM_NODES, DiagramSpec, Edge, Group, Node, NodeKind
+
+# --- Schema ---
+
+def load_schema():
+    schema_path = os.path.normpath(
+        os.path.join(os.path.dirname(__file__), '..', '..', '..', 'shared', 'schema', 'diagram_spec.schema.json')
+    )
+    try:
+        with open(schema_path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise RuntimeError(f"Schema file not found at: {schema_path}")
+
+DIAGRAM_SPEC_SCHEMA = load_schema()
+
+# Build the validator once at import time. `jsonschema.validate` re-checks the
+# schema and creates a new validator on every call, which is wasted work on
+# every retry of the generation pipeline.
+Draft7Validator.check_schema(DIAGRAM_SPEC_SCHEMA)
+DIAGRAM_SPEC_VALIDATOR = Draft7Validator(DIAGRAM_SPEC_SCHEMA)
+
+# Same rules with the node limit raised to MAX_DIAGRAM_NODES, for specs stitched
+# together from several generation passes.
+_LARGE_DIAGRAM_SPEC_SCHEMA = copy.deepcopy(DIAGRAM_SPEC_SCHEMA)
+_LARGE_DIAGRAM_SPEC_SCHEMA["properties"]["nodes"]["maxItems"] = MAX_DIAGRAM_NODES
+LARGE_DIAGRAM_SPEC_VALIDATOR = Draft7Validator(_LARGE_DIAGRAM_SPEC_SCHEMA)
+
+# --- Issues ---
+
+PathItem = Union[int, str]
+
+class ValidationIssue(BaseModel):
+    """A single problem found in a DiagramSpec, located by its JSON path."""
+    path: List[PathItem]
+    message: str
+    code: str
+
+def format_path(path: List[PathItem]) -> str:
+    """Renders a path like ['edges', 2, 'to'] as 'edges[2].to'."""
+    if not path:
+        return "<root>"
+    rendered = ""
+    for item in path:
+        if isinstance(item, int):
+            rendered += f"[{item}]"
+        else:
+            rendered += f".{item}" if rendered else item
+    return rendered
+
+def format_validation_issues(issues: List[ValidationIssue]) -> str:
+    """Formats issues as one line per problem, suitable for a repair prompt."""
+    return "\n".join(f"- {format_path(issue.path)}: {issue.message}" for issue in issues)
+
+_JSON_TYPES = {dict: "object", list: "array", str: "string", bool: "boolean", int: "integer", float: "number", type(None): "null"}
+
+def _schema_message(error) -> str:
+    """
+    A short message for a JSON Schema error. jsonschema's own messages embed
+    the whole failing instance (e.g. the full nodes array for maxItems), which
+    would bloat the repair prompt.
+    """
+    instance, limit = error.instance, error.validator_value
+    if error.validator == "maxItems":
+        return f"has {len(instance)} items; maximum is {limit}."
+    if error.validator == "minItems":
+        return f"has {len(instance)} items; minimum is {limit}."
+    if error.validator == "minLength":
+        return "must not be empty." if limit == 1 else f"must be at least {limit} characters."
+    if error.validator == "enum":
+        return "must be one of " + ", ".join(repr(v) for v in limit) + "."
+    if error.validator == "type":
+        return f"must be of type {limit}, not {_JSON_TYPES.get(type(instance), type(instance).__name__)}."
+    if error.validator == "required":
+        # One error per missing key; the default message names only that key.
+        return error.message + "."
+    return f"fails the '{error.validator}' rule."
+
+# --- Semantic checks ---
+
+def _check_semantics(data: Dict[str, Any]) -> List[ValidationIssue]:
+    """
+    Checks the cross-references the JSON Schema cannot express: unique node and
+    group ids, edge endpoints that exist, and group members that exist.
+    Entries the schema already rejected (wrong type, missing keys) are skipped.
+    """
+    issues: List[ValidationIssue] = []
+
+    nodes = data.get("nodes")
+    node_ids = set()
+    if isinstance(nodes, list):
+        for i, node in enumerate(nodes):
+            if not isinstance(node, dict) or not isinstance(node.get("id"), str):
+                continue
+            if node["id"] in node_ids:
+                issues.append(ValidationIssue(
+                    path=["nodes", i, "id"],
+                    message=f"Node ID '{node['id']}' is not unique.",
+                    code="duplicate_id",
+                ))
+            node_ids.add(node["id"])
+
+    edges = data.get("edges")
+    if isinstance(edges, list):
+        for i, edge in enumerate(edges):
+            if not isinstance(edge, dict):
+                continue
+            for key in ("from", "to"):
+                endpoint = edge.get(key)
+                if isinstance(endpoint, str) and endpoint not in node_ids:
+                    issues.append(ValidationIssue(
+                        path=["edges", i, key],
+                        message=f"Edge endpoint '{endpoint}' does not match any node id.",
+                        code="dangling_edge",
+                    ))
+
+    groups = data.get("groups")
+    if isinstance(groups, list):
+        group_ids = set()
+        for i, group in enumerate(groups):
+            if not isinstance(group, dict):
+                continue
+            group_id = group.get("id")
+            if isinstance(group_id, str):
+                if group_id in group_ids:
+                    issues.append(ValidationIssue(
+                        path=["groups", i, "id"],
+                        message=f"Group ID '{group_id}' is not unique.",
+                        code="duplicate_id",
+                    ))
+                group_ids.add(group_id)
+            members = group.get("node_ids")
+            if isinstance(members, list):
+                for j, member in enumerate(members):
+                    if isinstance(member, str) and member not in node_ids:
+                        issues.append(ValidationIssue(
+                            path=["groups", i, "node_ids", j],
+                            message=f"Group member '{member}' does not match any node id.",
+                            code="unknown_group_member",
+                        ))
+
+    return issues
+
+# --- Model construction ---
+
+def _build_spec(data: Dict[str, Any]) -> DiagramSpec:
+    """
+    Builds a DiagramSpec from data that has already passed validation, without
+    running the Pydantic validators a second time.
+    """
+    nodes = [
+        Node.construct(id=n["id"], text=n["text"], kind=NodeKind(n["kind"]))
+        for n in data["nodes"]
+    ]
+    edges = [
+        Edge.construct(from_node=e["from"], to_node=e["to"], text=e.get("text"))
+        for e in data["edges"]
+    ]
+    groups = None
+    if data.get("groups") is not None:
+        groups = [
+            Group.construct(id=g["id"], text=g["text"], node_ids=list(g["node_ids"]))
+            for g in data["groups"]
+        ]
+    return DiagramSpec.construct(nodes=nodes, edges=edges, groups=groups, style=data.get("style"))
+
+# --- Entry point ---
+
+def validate_diagram_spec(data: Any, large: bool = False, max_nodes: Optional[int] = None) -> Tuple[Optional[DiagramSpec], List[ValidationIssue]]:
+    """
+    Validates raw DiagramSpec data in a single pass.
+
+    Collects every JSON Schema error together with the semantic errors, so the
+    caller can report all of them at once. Returns the parsed spec when there
+    are no issues, otherwise `None` and the list of issues. `large` allows up
+    to MAX_DIAGRAM_NODES nodes instead of the single-pass MAX_NODES;
+    `max_nodes` tightens the limit further (e.g. a section's node budget).
+    """
+    validator = LARGE_DIAGRAM_SPEC_VALIDATOR if large else DIAGRAM_SPEC_VALIDATOR
+    issues = [
+        ValidationIssue(
+            path=list(error.absolute_path),
+            message=_schema_message(error),
+            code=error.validator,
+        )
+        for error in validator.iter_errors(data)
+    ]
+    if isinstance(data, dict):
+        nodes = data.get("nodes")
+        over_schema_limit = any(i.code == "maxItems" and i.path == ["nodes"] for i in issues)
+        if max_nodes is not None and isinstance(nodes, list) and len(nodes) > max_nodes and not over_schema_limit:
+            issues.append(ValidationIssue(
+                path=["nodes"],
+                message=f"has {len(nodes)} items; maximum is {max_nodes}.",
+                code="maxItems",
+            ))
+        issues.extend(_check_semantics(data))
+
+    if issues:
+        return None, issues
+    return _build_spec(data), issues
@@ -1,46 +1,64 @@
-import chromadb
-from chromadb.config import Settings
 import os
+import threading
 from typing import List, Dict, Any
+from app.core.storage_client import get_storage_client
 from app.services.embeddings import embed_text
 
-# Initialize ChromaDB client
-# Using a local persistent storage
+# Local persistent storage for ChromaDB
 CHROMA_DATA_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'chroma')
-os.makedirs(CHROMA_DATA_PATH, exist_ok=True)
+COLLECTION_NAME = "diagram_knowledge"
 
-client = chromadb.PersistentClient(path=CHROMA_DATA_PATH)
+# The client and collection are opened lazily on first use (or by the startup
+# warm-up). Importing chromadb and opening the persistent store is the slowest
+# part of a cold start, so it is kept out of module import.
+_collection = None
+_collection_lock = threading.Lock()
 
-# Get or create the collection
-collection = client.get_or_create_collection(
-    name="diagram_knowledge",
-    metadata={"hnsw:space": "cosine"} # Using cosine similarity
-)
+def get_collection():
+    """Returns the knowledge collection, opening the ChromaDB client on first use."""
+    global _collection
+    if _collection is None:
+        with _collection_lock:
+            if _collection is None:
+                import chromadb
 
-def ingest_document(doc_id: str, text: str, metadata: Dict[str, Any]):
-    """
-    Ingests a document chunk into ChromaDB with its embedding.
-    """
-    embedding = embed_text(text)
-    collection.add(
+                os.makedirs(CHROMA_DATA_PATH, exist_ok=True)
+                client = chromadb.PersistentClient(path=CHROMA_DATA_PATH)
+                # Get or create the collection
+                _collection = client.get_or_create_collection(
+                    name=COLLECTION_NAME,
+                    metadata={"hnsw:space": "cosine"} # Using cosine similarity
+                )
+    return _collection
+
+# When a storage service is configured (see app.core.storage_client), it owns
+# the Chroma collection. Embeddings are still computed in the calling worker,
+# so the service only does the local reads and writes.
+
+def check_vector_store() -> int:
+    """Readiness probe: returns the number of stored chunks, or raises."""
+    client = get_storage_client()
+    if client is not None:
+        return client.call("check_vector_store")
+    return get_collection().count()
+
+def add_chunk(doc_id: str, text: str, embedding: List[float], metadata: Dict[str, Any]):
+    """Stores an already-embedded chunk in the local collection."""
+    get_collection().add(
         ids=[doc_id],
         embeddings=[embedding],
         documents=[text],
         metadatas=[metadata]
     )
 
-def retrieve_context(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-    """
-    Retrieves relevant text chunks for a query with similarity scores.
-    """
-    query_embedding = embed_text(query)
-    
-    results = collection.query(
+def query_chunks(query_embedding: List[float], top_k: int = 5) -> List[Dict[str, Any]]:
+    """Finds the chunks in the local collection closest to an embedding."""
+    results = get_collection().query(
         query_embeddings=[query_embedding],
         n_results=top_k,
         include=["documents", "metadatas", "distances"]
     )
-    
+
     formatted_results = []
     if results['documents']:
         for i in range(len(results['documents'][0])):
@@ -49,5 +67,26 @@ def retrieve_context(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
                 "metadata": results['metadatas'][0][i],
                 "score": 1 - results['distances'][0][i] # Convert distance to similarity score
             })
-            
+
     return formatted_results
+
+def ingest_document(doc_id: str, text: str, metadata: Dict[str, Any]):
+    """
+    Ingests a document chunk into ChromaDB with its embedding.
+    """
+    embedding = embed_text(text)
+    client = get_storage_client()
+    if client is not None:
+        client.call("add_chunk", doc_id=doc_id, text=text, embedding=embedding, metadata=metadata)
+        return
+    add_chunk(doc_id, text, embedding, metadata)
+
+def retrieve_context(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+    """
+    Retrieves relevant text chunks for a query with similarity scores.
+    """
+    query_embedding = embed_text(query)
+    client = get_storage_client()
+    if client is not None:
+        return client.call("query_chunks", query_embedding=query_embedding, top_k=top_k)
+    return query_chunks(query_embedding, top_k)
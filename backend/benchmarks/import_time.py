@@ -0,0 +1,61 @@
+"""
+Measures the cold-start cost of importing the API.
+
+Each run starts a fresh interpreter and imports `app.main`, so nothing is
+cached between runs. Heavy dependencies (chromadb, LangGraph, the Gemini SDK)
+should not show up in the top imports; they are loaded lazily on first use.
+
+Usage (from the `backend` directory):
+    python benchmarks/import_time.py --runs 5
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+IMPORT_LINE = re.compile(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+def run_once(module: str):
+    """Imports `module` in a fresh interpreter; returns (total_us, {module: cumulative_us})."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"Importing {module} failed:\n" + "\n".join(errors))
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            cumulative[match.group(2)] = int(match.group(1))
+    return cumulative.get(module, 0), cumulative
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to list.")
+    args = parser.parse_args()
+
+    totals = []
+    last = {}
+    for _ in range(args.runs):
+        total, last = run_once(args.module)
+        totals.append(total / 1000)
+
+    print(f"import {args.module}: {args.runs} runs")
+    print(f"  median {statistics.median(totals):.1f} ms, min {min(totals):.1f} ms, max {max(totals):.1f} ms")
+    print(f"  slowest top-level imports (last run, cumulative):")
+    top_level = {name: us for name, us in last.items() if "." not in name and name != args.module}
+    for name, us in sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"    {us / 1000:8.1f} ms  {name}")
+
+if __name__ == "__main__":
+    main()
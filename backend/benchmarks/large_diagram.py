@@ -0,0 +1,105 @@
+"""
+Wall-clock scaling of the large-diagram pipeline with document length.
+
+Generates synthetic process documents of increasing length and runs
+`generate_large_diagram_spec` on each, reporting sections, nodes and time
+with sections generated concurrently and one at a time. Optionally times
+the ELK layout of the stitched diagram as well (needs Node.js and
+`npm install` in tools/).
+
+By default the LLM is simulated: every call sleeps `--latency` seconds and
+returns a synthetic subgraph of one node per sentence, so the numbers show
+the pipeline's own scaling without spending quota. Pass `--live` to call
+Gemini instead (GOOGLE_API_KEY required).
+
+Usage (from the `backend` directory):
+    python benchmarks/large_diagram.py --paragraphs 4 16 32 64 --latency 2.0 --layout
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.admission import AdmissionGate
+from app.core.config import settings
+from app.models.spec import DiagramSpec
+from app.services import large_generator
+from app.services.large_generator import MAX_SECTIONS, DocumentTooLargeError
+
+SENTENCES = [
+    "The operator reviews the incoming ticket",
+    "The system checks whether the customer is entitled to support",
+    "If the entitlement is missing the ticket is sent to sales",
+    "Otherwise the ticket is assigned to the on-call engineer",
+    "The engineer reproduces the issue in staging",
+]
+
+def synthetic_document(paragraphs: int) -> str:
+    return "\n\n".join(
+        f"Stage {p + 1}. " + ". ".join(SENTENCES) + "."
+        for p in range(paragraphs)
+    )
+
+def simulate_llm(latency: float):
+    """Replaces the pipeline's LLM calls with fixed-latency synthetic responses."""
+    async def section_spec(section_text, context, index, max_nodes):
+        await asyncio.sleep(latency)
+        sentences = [s.strip() for s in section_text.replace("\n", " ").split(".") if s.strip()][:max_nodes]
+        nodes = [{"id": f"n{i}", "text": s[:60], "kind": "process"} for i, s in enumerate(sentences)]
+        edges = [{"from": f"n{i}", "to": f"n{i + 1}"} for i in range(len(nodes) - 1)]
+        return DiagramSpec.parse_obj({"nodes": nodes, "edges": edges})
+
+    class StitchClient:
+        async def generate_json(self, system_prompt, user_prompt):
+            await asyncio.sleep(latency)
+            return json.dumps({"edges": []})  # Exercises the in-order fallback.
+
+    large_generator.generate_section_spec = section_spec
+    large_generator.get_gemini_client = lambda: StitchClient()
+
+async def timed_generation(text: str, concurrency: int):
+    settings.LARGE_DIAGRAM_CONCURRENCY = concurrency
+    # Size the shared generation queue to match, so it does not cap the run.
+    large_generator.generation_gate = AdmissionGate("generation", concurrency, MAX_SECTIONS, queue_timeout=600)
+    started = time.perf_counter()
+    spec = await large_generator.generate_large_diagram_spec(text)
+    return spec, time.perf_counter() - started
+
+def timed_layout(spec: DiagramSpec) -> float:
+    from app.services.layout import calculate_layout
+    started = time.perf_counter()
+    calculate_layout(spec)
+    return time.perf_counter() - started
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, nargs="+", default=[4, 16, 32, 64])
+    parser.add_argument("--latency", type=float, default=2.0, help="Simulated seconds per LLM call.")
+    parser.add_argument("--concurrency", type=int, default=settings.LARGE_DIAGRAM_CONCURRENCY)
+    parser.add_argument("--live", action="store_true", help="Call the real LLM instead of simulating it.")
+    parser.add_argument("--layout", action="store_true", help="Also time the ELK layout.")
+    args = parser.parse_args()
+
+    if not args.live:
+        simulate_llm(args.latency)
+
+    print(f"{'chars':>7} {'groups':>6} {'nodes':>6} {'concurrent s':>13} {'sequential s':>13}" + (f" {'layout s':>9}" if args.layout else ""))
+    for paragraphs in args.paragraphs:
+        text = synthetic_document(paragraphs)
+        try:
+            spec, concurrent = await timed_generation(text, args.concurrency)
+        except DocumentTooLargeError as e:
+            print(f"{len(text):>7} {e}")
+            continue
+        _, sequential = await timed_generation(text, 1)
+        row = f"{len(text):>7} {len(spec.groups):>6} {len(spec.nodes):>6} {concurrent:>13.2f} {sequential:>13.2f}"
+        if args.layout:
+            row += f" {timed_layout(spec):>9.2f}"
+        print(row)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,158 @@
+"""
+Load test for multi-worker deployments.
+
+For each worker count, starts the storage service and `uvicorn --workers N`
+against it, sends requests to an endpoint from `--concurrency` client threads
+for `--duration` seconds, and reports throughput and latency. Throughput on
+/v1/generate should grow with the number of workers until the LLM provider's
+rate limit is reached.
+
+Admission control (rate limits and the generation queue) is relaxed so it
+does not cap throughput: every client here is 127.0.0.1 and would share one
+token bucket. Pass `--keep-limits` to measure the configured limits instead;
+requests they reject are counted in the `429` column.
+
+/v1/generate calls the Gemini API, so GOOGLE_API_KEY must be set and every
+request consumes quota. Use `--endpoint /v1/layout --payload examples/example1_output.json`
+(wrapped automatically) to exercise the workers without the LLM.
+
+Usage (from the `backend` directory):
+    python benchmarks/load_generate.py --workers 1 2 4 --concurrency 16 --duration 30
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_TEXT = (
+    "A customer submits an order. The system checks stock. If the item is in stock, "
+    "payment is captured and the order ships. Otherwise the customer is notified and "
+    "the order is placed on backorder."
+)
+
+def wait_for(url: str, timeout: float):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1):
+                return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+def post(url: str, body: bytes):
+    """Sends one request; returns (HTTP status, seconds)."""
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=300) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+        e.read()
+    return status, time.perf_counter() - started
+
+def run_load(url: str, body: bytes, concurrency: int, duration: float):
+    deadline = time.time() + duration
+
+    def client():
+        results = []
+        while time.time() < deadline:
+            results.append(post(url, body))
+        return results
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = [r for batch in pool.map(lambda _: client(), range(concurrency)) for r in batch]
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for status, latency in results if status == 200)
+    return {
+        "requests": len(results),
+        "rejected": sum(1 for status, _ in results if status == 429),
+        "errors": sum(1 for status, _ in results if status not in (200, 429)),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else None,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else None,
+    }
+
+def relaxed_limits(concurrency: int) -> dict:
+    """Settings overrides so admission control never rejects the load test's requests."""
+    unlimited = str(10 ** 9)
+    return {
+        "RATE_LIMIT_CLIENT_PER_MINUTE": unlimited,
+        "RATE_LIMIT_CLIENT_BURST": unlimited,
+        "RATE_LIMIT_SESSION_PER_MINUTE": unlimited,
+        "RATE_LIMIT_SESSION_BURST": unlimited,
+        "GENERATE_MAX_CONCURRENCY": str(concurrency),
+        "GENERATE_MAX_QUEUE": str(concurrency),
+        "INGEST_MAX_CONCURRENCY": str(concurrency),
+        "INGEST_MAX_QUEUE": str(concurrency),
+    }
+
+def start_stack(workers: int, port: int, socket_path: str, overrides: dict):
+    env = dict(os.environ, STORAGE_SERVICE_ADDRESS=f"unix:{socket_path}", WARMUP_ON_STARTUP="true", **overrides)
+    storage = subprocess.Popen(
+        [sys.executable, "-m", "app.services.storage_server", "--address", f"unix:{socket_path}"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    web = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    return storage, web
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--endpoint", default="/v1/generate")
+    parser.add_argument("--keep-limits", action="store_true", help="Keep the configured admission limits.")
+    parser.add_argument("--payload", help="JSON file to send. For /v1/layout a bare DiagramSpec is wrapped.")
+    args = parser.parse_args()
+
+    if args.payload:
+        with open(args.payload) as f:
+            payload = json.load(f)
+        if args.endpoint == "/v1/layout" and "diagram_spec" not in payload:
+            payload = {"diagram_spec": payload}
+    else:
+        payload = {"text": DEFAULT_TEXT}
+    body = json.dumps(payload).encode("utf-8")
+
+    socket_path = os.path.join(tempfile.gettempdir(), f"flowra-storage-{os.getpid()}.sock")
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    print(f"{args.endpoint}, concurrency {args.concurrency}, {args.duration:.0f}s per run")
+    overrides = {} if args.keep_limits else relaxed_limits(args.concurrency)
+    print(f"{'workers':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'429':>7} {'errors':>7}")
+    for workers in args.workers:
+        storage, web = start_stack(workers, args.port, socket_path, overrides)
+        try:
+            wait_for(f"{base_url}/health", timeout=60)
+            # One untimed request per worker so lazy initialization is not measured.
+            for _ in range(workers):
+                post(base_url + args.endpoint, body)
+            stats = run_load(base_url + args.endpoint, body, args.concurrency, args.duration)
+        finally:
+            for proc in (web, storage):
+                proc.terminate()
+                proc.wait()
+        p50 = f"{stats['p50_ms']:.0f}" if stats["p50_ms"] is not None else "-"
+        p95 = f"{stats['p95_ms']:.0f}" if stats["p95_ms"] is not None else "-"
+        print(f"{workers:>8} {stats['throughput']:>8.2f} {p50:>8} {p95:>8} {stats['rejected']:>7} {stats['errors']:>7}")
+
+if __name__ == "__main__":
+    main()
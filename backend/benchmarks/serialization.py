@@ -0,0 +1,107 @@
+"""
+Micro-benchmark for response serialization of layouts and session histories.
+
+Compares, per request, the previous code paths (response_model re-validation +
+jsonable_encoder + json.dumps; spec.json -> json.loads -> json.dumps for the
+layout engine payload; decoding and re-encoding stored history) with the
+current ones (orjson, dict-once payloads, raw history passthrough), and
+reports compressed sizes.
+
+Usage (from the `backend` directory):
+    python benchmarks/serialization.py --nodes 10 40 --history 10
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), '..')))
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from app.core.compression import brotli, compress
+from app.models.spec import LayoutSpec
+
+KINDS = ["start", "process", "decision", "data", "note", "end"]
+
+def synthetic_layout(num_nodes: int) -> dict:
+    nodes = [
+        {
+            "id": f"n{i}", "text": f"Step {i}: validate the incoming request", "kind": KINDS[i % len(KINDS)],
+            "x": float(i % 8) * 180, "y": float(i // 8) * 120, "width": 160.0, "height": 60.0, "locked": False,
+        }
+        for i in range(num_nodes)
+    ]
+    edges = [
+        {"from": f"n{i}", "to": f"n{i + 1}", "text": "next" if i % 3 else None,
+         "points": [[float(i) * 10, 0.0], [float(i) * 10, 40.0], [float(i) * 10 + 80, 40.0]]}
+        for i in range(num_nodes - 1)
+    ]
+    return {"nodes": nodes, "edges": edges, "groups": [], "style": None}
+
+def per_call_us(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+def report(label: str, old_us: float, new_us: float):
+    print(f"  {label:<28} old {old_us:9.1f} us   new {new_us:9.1f} us   {old_us / new_us:5.1f}x")
+
+def bench_layout(num_nodes: int, number: int):
+    data = synthetic_layout(num_nodes)
+    spec = LayoutSpec.parse_obj(data)
+    engine_output_pretty = json.dumps(data, indent=2)
+    engine_output_compact = orjson.dumps(data)
+
+    print(f"layout, {num_nodes} nodes")
+    # Building the layout engine's stdin payload.
+    report(
+        "engine payload",
+        per_call_us(lambda: json.dumps({"diagram_spec": json.loads(spec.json(by_alias=True)), "constraints": None}), number),
+        per_call_us(lambda: orjson.dumps({"diagram_spec": spec.dict(by_alias=True), "constraints": None}), number),
+    )
+    # Parsing the layout engine's stdout.
+    report(
+        "engine output parse",
+        per_call_us(lambda: LayoutSpec(**json.loads(engine_output_pretty)), number),
+        per_call_us(lambda: LayoutSpec.parse_obj(orjson.loads(engine_output_compact)), number),
+    )
+    # Writing the HTTP response.
+    report(
+        "response body",
+        per_call_us(lambda: json.dumps(jsonable_encoder(LayoutSpec.parse_obj(spec.dict(by_alias=True)), by_alias=True)).encode(), number),
+        per_call_us(lambda: orjson.dumps(spec.dict(by_alias=True)), number),
+    )
+    print_compression(orjson.dumps(spec.dict(by_alias=True)), number)
+
+def bench_history(entries: int, num_nodes: int, number: int):
+    stored = [orjson.dumps(synthetic_layout(num_nodes)).decode() for _ in range(entries)]
+    print(f"history, {entries} entries of {num_nodes} nodes")
+    report(
+        "response body",
+        per_call_us(lambda: json.dumps(jsonable_encoder([json.loads(s) for s in stored])).encode(), number),
+        per_call_us(lambda: ("[" + ",".join(stored) + "]").encode(), number),
+    )
+    print_compression(("[" + ",".join(stored) + "]").encode(), number)
+
+def print_compression(body: bytes, number: int):
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+    sizes = ", ".join(
+        f"{enc} {len(compress(body, enc))} B ({per_call_us(lambda: compress(body, enc), max(1, number // 10)):.0f} us)"
+        for enc in encodings
+    )
+    print(f"  {'compression':<28} raw {len(body)} B, {sizes}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, nargs="+", default=[10, 40])
+    parser.add_argument("--history", type=int, default=10, help="Entries per history response.")
+    parser.add_argument("--number", type=int, default=200, help="Calls per timing run.")
+    args = parser.parse_args()
+
+    for num_nodes in args.nodes:
+        bench_layout(num_nodes, args.number)
+    bench_history(args.history, max(args.nodes), args.number)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark for SVG export on large synthetic layouts.
+
+Compares the previous inline renderer from the /v1/export/svg route with the
+streaming renderer in app.services.svg_export (cold render and cache hit),
+and measures batch zip export throughput.
+
+Usage (from the `backend` directory):
+    python benchmarks/svg_export.py --nodes 40 200 500 --batch 50
+"""
+import argparse
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.spec import LayoutSpec
+from app.services.svg_export import SVGCache, export_zip_stream, layout_hash, render_svg
+import app.services.svg_export as svg_export
+
+KINDS = ["start", "process", "decision", "data", "note", "end"]
+
+def synthetic_layout(num_nodes: int, group_size: int = 25) -> LayoutSpec:
+    nodes = [
+        {"id": f"n{i}", "text": f"Step {i} & check <input>", "kind": KINDS[i % len(KINDS)],
+         "x": float(i % 10) * 180, "y": float(i // 10) * 120, "width": 160.0, "height": 60.0}
+        for i in range(num_nodes)
+    ]
+    edges = [
+        {"from": f"n{i}", "to": f"n{i + 1}", "text": "yes" if i % 4 == 0 else None,
+         "points": [[i % 10 * 180 + 80.0, i // 10 * 120 + 60.0], [i % 10 * 180 + 80.0, i // 10 * 120 + 90.0],
+                    [(i + 1) % 10 * 180 + 80.0, (i + 1) // 10 * 120.0]]}
+        for i in range(num_nodes - 1)
+    ]
+    groups = [
+        {"id": f"g{g}", "text": f"Group {g}", "node_ids": [f"n{i}" for i in range(g * group_size, min(num_nodes, (g + 1) * group_size))]}
+        for g in range((num_nodes + group_size - 1) // group_size)
+    ]
+    return LayoutSpec.parse_obj({"nodes": nodes, "edges": edges, "groups": groups})
+
+def old_render(layout: LayoutSpec) -> str:
+    """The renderer that used to live in the /v1/export/svg route."""
+    svg_elements = []
+    max_x, max_y = 0, 0
+    for node in layout.nodes:
+        svg_elements.append(f'<rect x="{node.x}" y="{node.y}" rx="5" ry="5" width="{node.width}" height="{node.height}" fill="#fff" stroke="#333" stroke-width="2"/>')
+        svg_elements.append(f'<text x="{node.x + node.width / 2}" y="{node.y + node.height / 2}" dominant-baseline="middle" text-anchor="middle" font-family="sans-serif" font-size="12">{node.text}</text>')
+        max_x = max(max_x, node.x + node.width)
+        max_y = max(max_y, node.y + node.height)
+    for edge in layout.edges:
+        if edge.points:
+            path_data = "M " + " L ".join([f"{p[0]},{p[1]}" for p in edge.points])
+            svg_elements.append(f'<path d="{path_data}" stroke="#333" stroke-width="2" fill="none" marker-end="url(#arrowhead)" />')
+    svg_header = f'''<svg width="{max_x + 50}" height="{max_y + 50}" xmlns="http://www.w3.org/2000/svg">
+    <defs>
+        <marker id="arrowhead" markerWidth="10" markerHeight="7" refX="0" refY="3.5" orient="auto">
+            <polygon points="0 0, 10 3.5, 0 7" />
+        </marker>
+    </defs>
+    '''
+    return f'{svg_header}{"".join(svg_elements)}</svg>'
+
+def per_call_ms(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1000
+
+def cache_hit(layout: LayoutSpec, cache: SVGCache) -> bytes:
+    """What the route does on a repeat export: hash the layout and look it up."""
+    return cache.get(layout_hash(layout))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, nargs="+", default=[40, 200, 500])
+    parser.add_argument("--batch", type=int, default=50, help="Layouts per zip export.")
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'nodes':>6} {'old ms':>8} {'new ms':>8} {'hit ms':>8} {'old KB':>8} {'new KB':>8}")
+    for num_nodes in args.nodes:
+        layout = synthetic_layout(num_nodes)
+        cache = SVGCache()
+        rendered = b"".join(render_svg(layout))
+        cache.put(layout_hash(layout), rendered)
+        old_ms = per_call_ms(lambda: old_render(layout).encode(), args.number)
+        new_ms = per_call_ms(lambda: b"".join(render_svg(layout)), args.number)
+        hit_ms = per_call_ms(lambda: cache_hit(layout, cache), args.number)
+        print(f"{num_nodes:>6} {old_ms:>8.2f} {new_ms:>8.2f} {hit_ms:>8.2f} "
+              f"{len(old_render(layout).encode()) / 1024:>8.1f} {len(rendered) / 1024:>8.1f}")
+
+    # Batch export of distinct layouts, so every entry is a cold render.
+    svg_export.svg_cache = SVGCache()
+    layouts = [synthetic_layout(max(args.nodes) - i) for i in range(args.batch)]
+    started = time.perf_counter()
+    archive_size = sum(len(chunk) for chunk in export_zip_stream((f"{i}.svg", l) for i, l in enumerate(layouts)))
+    elapsed = time.perf_counter() - started
+    print(f"batch: {args.batch} layouts of ~{max(args.nodes)} nodes -> {archive_size / 1024:.0f} KB zip "
+          f"in {elapsed:.2f}s ({args.batch / elapsed:.1f} diagrams/s)")
+
+if __name__ == "__main__":
+    main()
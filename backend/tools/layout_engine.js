@@ -25,76 +25,140 @@ function estimateSize(node) {
     return { width, height };
 }
 
+// Group nodes share ELK's id space with diagram nodes, so they get a prefix.
+const GROUP_PREFIX = 'group:';
+const GROUP_PADDING = '[top=40,left=20,bottom=20,right=20]';
+
+function toElkNode(node, index, lockedNodes) {
+    const size = estimateSize(node);
+    const nodeData = {
+        id: node.id,
+        _original: node,
+        _index: index,
+        width: size.width,
+        height: size.height
+    };
+    // Best-effort hint for locked nodes. ELK's layered algorithm
+    // may still adjust positions to resolve conflicts.
+    if (lockedNodes[node.id]) {
+        nodeData.x = lockedNodes[node.id].x;
+        nodeData.y = lockedNodes[node.id].y;
+    }
+    return nodeData;
+}
+
+function edgePoints(edge, offset) {
+    const section = edge.sections[0];
+    const points = section.bendPoints ?
+        [section.startPoint, ...section.bendPoints, section.endPoint] :
+        [section.startPoint, section.endPoint];
+    return points.map(p => [p.x + offset.x, p.y + offset.y]);
+}
+
 async function runLayout(diagramSpec, constraints) {
     const lockedNodes = constraints?.lockedNodes || {};
+    const groups = diagramSpec.groups || [];
 
-    const elkGraph = {
+    // Each node belongs to at most one compound node: its first group.
+    const groupOf = {};
+    groups.forEach(group => {
+        group.node_ids.forEach(id => {
+            if (!(id in groupOf)) groupOf[id] = group.id;
+        });
+    });
+
+    const groupNodes = {};
+    groups.forEach(group => {
+        groupNodes[group.id] = {
+            id: GROUP_PREFIX + group.id,
+            _group: group,
+            layoutOptions: { 'elk.padding': GROUP_PADDING },
+            children: [],
+            edges: []
+        };
+    });
+
+    const root = {
         id: 'root',
         layoutOptions: {
             'elk.algorithm': 'layered',
             'elk.direction': diagramSpec.style === 'LR' ? 'RIGHT' : 'DOWN',
             'elk.layered.spacing.nodeNodeBetweenLayers': '80',
-            'elk.spacing.nodeNode': '60'
+            'elk.spacing.nodeNode': '60',
+            // Lay out group contents and cross-group edges in one pass.
+            'elk.hierarchyHandling': 'INCLUDE_CHILDREN'
         },
-        children: diagramSpec.nodes.map(node => {
-            const size = estimateSize(node);
-            const nodeData = {
-                id: node.id,
-                _original: node,
-                width: size.width,
-                height: size.height
-            };
-            // Best-effort hint for locked nodes. ELK's layered algorithm
-            // may still adjust positions to resolve conflicts.
-            if (lockedNodes[node.id]) {
-                nodeData.x = lockedNodes[node.id].x;
-                nodeData.y = lockedNodes[node.id].y;
-            }
-            return nodeData;
-        }),
-        edges: diagramSpec.edges.map((edge, i) => ({
+        children: [],
+        edges: []
+    };
+
+    diagramSpec.nodes.forEach((node, i) => {
+        const parent = groupNodes[groupOf[node.id]] || root;
+        parent.children.push(toElkNode(node, i, lockedNodes));
+    });
+    Object.values(groupNodes).forEach(groupNode => {
+        if (groupNode.children.length) root.children.push(groupNode);
+    });
+
+    // An edge is declared in the group containing both ends, otherwise at the
+    // root, so its coordinates are relative to that container.
+    diagramSpec.edges.forEach((edge, i) => {
+        const sourceGroup = groupOf[edge.from];
+        const container = sourceGroup && sourceGroup === groupOf[edge.to] ? groupNodes[sourceGroup] : root;
+        container.edges.push({
             id: `e${i}`,
             sources: [edge.from],
             targets: [edge.to],
-            _original: edge
-        }))
-    };
+            _original: edge,
+            _index: i
+        });
+    });
 
-    const layout = await elk.layout(elkGraph);
+    const layout = await elk.layout(root);
 
-    // After layout, we MUST override the positions for locked nodes
-    // to ensure they are exactly where the user placed them.
-    layout.children.forEach(node => {
-        if (lockedNodes[node.id]) {
-            node.x = lockedNodes[node.id].x;
-            node.y = lockedNodes[node.id].y;
-        }
-    });
+    const nodes = [];
+    const edges = [];
+    const layoutGroups = {};
 
-    const layoutSpec = {
-        nodes: layout.children.map(node => ({
-            ...node._original,
-            x: node.x,
-            y: node.y,
-            width: node.width,
-            height: node.height,
-            // Carry over the locked status
-            locked: !!lockedNodes[node.id] 
-        })),
-        edges: layout.edges.map(edge => {
-            const { from, to, text } = edge._original;
-            const points = edge.sections[0].bendPoints ? 
-                [edge.sections[0].startPoint, ...edge.sections[0].bendPoints, edge.sections[0].endPoint] : 
-                [edge.sections[0].startPoint, edge.sections[0].endPoint];
-            
-            return {
-                from,
-                to,
-                text,
-                points: points.map(p => [p.x, p.y])
+    // Walk the hierarchy, turning container-relative coordinates into absolute ones.
+    function collect(container, offset) {
+        (container.children || []).forEach(child => {
+            const position = { x: offset.x + child.x, y: offset.y + child.y };
+            if (child._group) {
+                layoutGroups[child._group.id] = {
+                    ...child._group,
+                    x: position.x,
+                    y: position.y,
+                    width: child.width,
+                    height: child.height
+                };
+                collect(child, position);
+                return;
+            }
+            // After layout, we MUST override the positions for locked nodes
+            // to ensure they are exactly where the user placed them.
+            const locked = lockedNodes[child.id];
+            nodes[child._index] = {
+                ...child._original,
+                x: locked ? locked.x : position.x,
+                y: locked ? locked.y : position.y,
+                width: child.width,
+                height: child.height,
+                // Carry over the locked status
+                locked: !!locked
             };
-        }),
-        groups: diagramSpec.groups || [],
+        });
+        (container.edges || []).forEach(edge => {
+            const { from, to, text } = edge._original;
+            edges[edge._index] = { from, to, text, points: edgePoints(edge, offset) };
+        });
+    }
+    collect(layout, { x: 0, y: 0 });
+
+    const layoutSpec = {
+        nodes: nodes.filter(Boolean),
+        edges: edges.filter(Boolean),
+        groups: groups.map(group => layoutGroups[group.id] || group),
         style: diagramSpec.style
     };
 
@@ -117,7 +181,7 @@ async function main() {
     try {
         const { diagram_spec, constraints } = JSON.parse(data);
         const layoutSpec = await runLayout(diagram_spec, constraints);
-        process.stdout.write(JSON.stringify(layoutSpec, null, 2));
+        process.stdout.write(JSON.stringify(layoutSpec));
     } catch (error) {
         console.error(`Error: Layout engine failed. ${error.message}`);
         process.exit(1);
@@ -41,10 +41,18 @@ export interface LayoutEdge extends Edge {
   points: Point[];
 }
 
+// Groups laid out as compound nodes carry their bounding box.
+export interface LayoutGroup extends Group {
+  x?: number;
+  y?: number;
+  width?: number;
+  height?: number;
+}
+
 export interface LayoutSpec {
   nodes: LayoutNode[];
   edges: LayoutEdge[];
-  groups?: Group[];
+  groups?: LayoutGroup[];
   style?: string;
 }
 